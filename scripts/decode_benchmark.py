@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+benchmarks the decoder of `wlr-randr --json` output on generated fixtures,
+from a laptop to a video wall with hundreds of modes per output
+
+what the decoder accepts and rejects is checked by tests/test_decode.py,
+on outputs from the same generator
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# runnable from anywhere without installing wayrandr
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wayrandr.monitor import decode_monitors
+
+
+def output(index: int, mode_count: int) -> dict:
+    modes = [
+        {
+            "width": 640 + (i // 4) * 32,
+            "height": 480 + (i // 4) * 18,
+            "refresh": [60.0, 74.973, 120.0, 143.998][i % 4],
+            "preferred": i == mode_count - 1,
+            "current": i == mode_count - 1,
+        }
+        for i in range(mode_count)
+    ]
+    return {
+        "name": f"DP-{index}",
+        "description": f"Make Model {index} (DP-{index})",
+        "make": "Make",
+        "model": f"Model {index}",
+        "serial": f"SN{index:04}",
+        "physical_size": {"width": 600, "height": 340},
+        "enabled": index % 3 != 2,
+        "modes": modes,
+        "position": {"x": index * 1920, "y": 0},
+        "transform": ["normal", "90", "flipped-180"][index % 3],
+        "scale": 1.0 + (index % 2) / 2,
+        "adaptive_sync": False,
+    }
+
+
+def fixture(heads: int, modes: int) -> str:
+    return json.dumps([output(index, modes) for index in range(heads)], indent=2)
+
+
+FIXTURES = {
+    "laptop": fixture(1, 24),
+    "workstation": fixture(4, 60),
+    "video wall": fixture(16, 400),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, text in FIXTURES.items():
+        data = text.encode()
+        timer = timeit.Timer(lambda data=data: decode_monitors(data))
+        seconds = min(timer.repeat(number=args.number, repeat=5))
+        print(f"{name:<16} {len(data):>9} B {seconds / args.number * 1e6:10.1f} us")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+stand-in for wlr-randr, to run and benchmark the read and apply paths without a compositor
+
+link it as wlr-randr into a directory put first in PATH:
+
+    fake=$(mktemp -d) && ln -s "$PWD/scripts/fake_wlr_randr.py" "$fake/wlr-randr"
+    export FAKE_WLR_RANDR_STATE="$fake/state.json"
+    PATH=$fake:$PATH python -m wayrandr.cli list
+
+the outputs are kept in the file $FAKE_WLR_RANDR_STATE points to, it is required
+so parallel runs never share one (canned two outputs are used until it exists),
+--output arguments change them like a compositor would, --dryrun only validates,
+$FAKE_WLR_RANDR_DELAY_MS adds latency to every call
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+CANNED = [
+    {
+        "name": "eDP-1",
+        "description": "BOE 0x0BCA (eDP-1)",
+        "make": "BOE",
+        "model": "0x0BCA",
+        "serial": None,
+        "enabled": True,
+        "modes": [
+            {"width": 2256, "height": 1504, "refresh": 59.999, "preferred": True, "current": True},
+            {
+                "width": 1920,
+                "height": 1200,
+                "refresh": 59.999,
+                "preferred": False,
+                "current": False,
+            },
+        ],
+        "position": {"x": 0, "y": 0},
+        "transform": "normal",
+        "scale": 1.5,
+    },
+    {
+        "name": "DP-1",
+        "description": "Dell Inc. DELL U2720Q 12345 (DP-1)",
+        "make": "Dell Inc.",
+        "model": "DELL U2720Q",
+        "serial": "12345",
+        "enabled": True,
+        "modes": [
+            {"width": 3840, "height": 2160, "refresh": 60.0, "preferred": True, "current": True},
+            {"width": 3840, "height": 2160, "refresh": 30.0, "preferred": False, "current": False},
+            {"width": 1920, "height": 1080, "refresh": 60.0, "preferred": False, "current": False},
+        ],
+        "position": {"x": 1504, "y": 0},
+        "transform": "normal",
+        "scale": 1.0,
+    },
+]
+
+TRANSFORMS = {"normal", "90", "180", "270", "flipped", "flipped-90", "flipped-180", "flipped-270"}
+
+
+class InvalidArgumentError(Exception):
+    pass
+
+
+def set_mode(output: dict, value: str) -> None:
+    resolution, _, refresh = value.partition("@")
+    width, _, height = resolution.partition("x")
+    for mode in output["modes"]:
+        if (
+            str(mode["width"]) == width
+            and str(mode["height"]) == height
+            and (not refresh or abs(mode["refresh"] - float(refresh.removesuffix("Hz"))) < 0.01)
+        ):
+            for other in output["modes"]:
+                other["current"] = other is mode
+            return
+
+    raise InvalidArgumentError(f"invalid mode {value} for {output['name']}")
+
+
+def configure(outputs: list[dict], arguments: list[str]) -> None:
+    by_name = {output["name"]: output for output in outputs}
+    output = None
+    words = iter(arguments)
+    for word in words:
+        if word == "--output":
+            name = next(words, "")
+            if name not in by_name:
+                raise InvalidArgumentError(f"unknown output {name}")
+            output = by_name[name]
+        elif output is None:
+            raise InvalidArgumentError(f"{word} without --output")
+        elif word == "--on":
+            output["enabled"] = True
+        elif word == "--off":
+            output["enabled"] = False
+        elif word == "--mode":
+            set_mode(output, next(words, ""))
+        elif word == "--pos":
+            x, _, y = next(words, "").partition(",")
+            output["position"] = {"x": int(x), "y": int(y)}
+        elif word == "--transform":
+            transform = next(words, "")
+            if transform not in TRANSFORMS:
+                raise InvalidArgumentError(f"invalid transform {transform}")
+            output["transform"] = transform
+        elif word == "--scale":
+            output["scale"] = float(next(words, ""))
+        else:
+            raise InvalidArgumentError(f"unknown argument {word}")
+
+
+def main() -> int:
+    if not os.environ.get("FAKE_WLR_RANDR_STATE"):
+        print("FAKE_WLR_RANDR_STATE must be set to the file with the outputs", file=sys.stderr)
+        return 2
+
+    state = Path(os.environ["FAKE_WLR_RANDR_STATE"])
+    time.sleep(float(os.environ.get("FAKE_WLR_RANDR_DELAY_MS", "0")) / 1000)
+    outputs = json.loads(state.read_text()) if state.exists() else CANNED
+    arguments = sys.argv[1:]
+    if arguments == ["--json"]:
+        print(json.dumps(outputs, indent=2))
+        return 0
+
+    dry_run = "--dryrun" in arguments
+    try:
+        configure(outputs, [argument for argument in arguments if argument != "--dryrun"])
+    except (InvalidArgumentError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if not dry_run:
+        state.write_text(json.dumps(outputs, indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+microbenchmark of the hot paths of the data model (transform lookups, modes)
+
+run it before and after a change of wayrandr/monitor.py and compare the numbers
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+# runnable from anywhere without installing wayrandr
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wayrandr.monitor import Mode, Monitor, Position, Transform
+
+
+def monitor_with_modes(count: int) -> Monitor:
+    modes = [
+        Mode(width=640 + i * 16, height=480 + i * 9, refresh=60, preferred=False, current=False)
+        for i in range(count)
+    ]
+    # the current mode is usually somewhere in the middle of the list
+    modes[count // 2].current = True
+    return Monitor(
+        name="DP-1",
+        make="Make",
+        model="Model",
+        serial="Serial",
+        enabled=True,
+        scale=1.0,
+        position=Position(x=0, y=0),
+        modes=modes,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--modes", type=int, default=40, help="modes of the monitor")
+    args = parser.parse_args()
+
+    monitor = monitor_with_modes(args.modes)
+    transform = Transform.flipped_90
+    cases = {
+        "Transform.value_index": lambda: transform.value_index(),
+        "Transform.flipped_value": lambda: transform.flipped_value(),
+        "Transform.is_flipped": lambda: transform.is_flipped,
+        "Transform.is_rotated": lambda: transform.is_rotated,
+        "Transform.reverse_map": lambda: Transform.reverse_map()[5],
+        "Monitor.active_mode": lambda: monitor.active_mode,
+        "Monitor.width/height": lambda: (monitor.width, monitor.height),
+        "Monitor.active_mode =": lambda: setattr(monitor, "active_mode", monitor.modes[-1]),
+        "ModeTable.best_refresh": lambda: monitor.mode_table.best_refresh(1264, 831),
+        "ModeTable.closest": lambda: monitor.mode_table.closest(1270, 830, 59.9),
+    }
+
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.number, repeat=5))
+        print(f"{name:<26} {seconds / args.number * 1e9:8.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+measures startup of wayrandr from this repository, run it inside a wayland session
+(or with QT_QPA_PLATFORM=offscreen, outputs are still read from wlr-randr)
+
+prints median of every phase over several runs, with --budget the exit code is 1
+when the first paint takes longer, so regressions are visible
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# wayrandr is imported from the repository, not from whatever is installed
+ROOT = Path(__file__).resolve().parent.parent
+
+PHASE_PATTERN = re.compile(r"^(?P<phase>[a-z ]+): (?P<ms>\d+(?:\.\d+)?) ms$")
+
+
+def wall_time(command: list[str], env: dict[str, str], timeout: float) -> tuple[float, str]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        command,
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=timeout,
+    )
+    return (time.perf_counter() - started) * 1000, result.stderr
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="max median of first paint in ms")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="seconds to wait for one run before giving up",
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ, WAYRANDR_STARTUP_TIMES="exit")
+    commands = {
+        "python": [sys.executable, "-c", "pass"],
+        "cli import": [sys.executable, "-c", "import wayrandr.cli"],
+        "gui": [sys.executable, "-m", "wayrandr.main"],
+    }
+
+    results: dict[str, list[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        for name, command in commands.items():
+            try:
+                elapsed, stderr = wall_time(command, env, args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{name} did not finish in {args.timeout} s", file=sys.stderr)
+                return 1
+
+            results[f"{name} (wall)"].append(elapsed)
+            for line in stderr.splitlines():
+                match = PHASE_PATTERN.match(line)
+                if match:
+                    results[f"gui {match['phase']}"].append(float(match["ms"]))
+
+    for name, times in results.items():
+        print(f"{name:<24} {statistics.median(times):8.1f} ms")
+
+    first_paint = results.get("gui first paint")
+    if args.budget is not None and first_paint and statistics.median(first_paint) > args.budget:
+        print(f"first paint is over the budget of {args.budget} ms", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from wayrandr.monitor import output_state
+
+FAKE_WLR_RANDR = Path(__file__).resolve().parent.parent / "scripts" / "fake_wlr_randr.py"
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch) -> Iterator[Path]:
+    """
+    The fake wlr-randr first in PATH, with its own state file.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "wlr-randr").symlink_to(FAKE_WLR_RANDR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    result = tmp_path / "state.json"
+    monkeypatch.setenv("FAKE_WLR_RANDR_STATE", str(result))
+    output_state.invalidate()
+    yield result
+    output_state.invalidate()
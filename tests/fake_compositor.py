@@ -0,0 +1,332 @@
+"""
+wayland compositor that speaks just enough of the wire protocol to serve
+zwlr_output_manager_v1 over a UNIX socket, so the wayland backend can be tested
+without a real compositor
+"""
+
+import os
+import socket
+import threading
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Optional
+
+from wayrandr.wayland import (
+    _HEADER,
+    DISPLAY_ID,
+    OUTPUT_MANAGER_INTERFACE,
+    decode_arguments,
+    encode_arguments,
+    encode_message,
+)
+
+# server side ids, clients allocate from the bottom
+_FIRST_SERVER_ID = 0xFF000000
+_MANAGER_GLOBAL = 7
+
+# interface -> request opcode -> (request name, signature)
+_REQUESTS: dict[str, dict[int, tuple[str, str]]] = {
+    "wl_display": {0: ("sync", "n"), 1: ("get_registry", "n")},
+    "wl_registry": {0: ("bind", "usun")},
+    "zwlr_output_manager_v1": {0: ("create_configuration", "nu"), 1: ("stop", "")},
+    "zwlr_output_configuration_v1": {
+        0: ("enable_head", "no"),
+        1: ("disable_head", "o"),
+        2: ("apply", ""),
+        3: ("test", ""),
+        4: ("destroy", ""),
+    },
+    "zwlr_output_configuration_head_v1": {
+        0: ("set_mode", "o"),
+        1: ("set_custom_mode", "iii"),
+        2: ("set_position", "ii"),
+        3: ("set_transform", "i"),
+        4: ("set_scale", "f"),
+    },
+}
+
+
+@dataclass
+class FakeMode:
+    width: int
+    height: int
+    # mHz
+    refresh: int
+    preferred: bool = False
+    object_id: int = 0
+
+
+@dataclass
+class FakeHead:
+    name: str
+    make: str
+    model: str
+    serial: Optional[str]
+    modes: list[FakeMode]
+    current: int = 0
+    enabled: bool = True
+    x: int = 0
+    y: int = 0
+    transform: int = 0
+    scale: float = 1.0
+    object_id: int = 0
+
+
+@dataclass
+class _Configuration:
+    serial: int
+    # head object id -> requested state, None disables the head
+    heads: dict[int, Optional[dict]] = field(default_factory=dict)
+
+
+class FakeCompositor:
+    """
+    Serves one client at a time on `path` from a background thread.
+
+    Applied configurations change `heads`, `fail` makes the compositor reject them.
+    """
+
+    def __init__(self, path: str, heads: list[FakeHead]) -> None:
+        self.path = path
+        self.heads = heads
+        self.fail = False
+        self.serial = 1
+        self.applied = 0
+        self._next_id = _FIRST_SERVER_ID
+        for head in heads:
+            head.object_id = self._new_id()
+            for mode in head.modes:
+                mode.object_id = self._new_id()
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self) -> "FakeCompositor":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._server.close()
+        os.unlink(self.path)
+
+    def _new_id(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+
+            with client:
+                try:
+                    _Client(self, client).run()
+                except BrokenPipeError:
+                    # the client went away without reading all events
+                    pass
+
+
+class _Client:
+    def __init__(self, compositor: FakeCompositor, sock: socket.socket) -> None:
+        self.compositor = compositor
+        self.sock = sock
+        self.objects: dict[int, str] = {DISPLAY_ID: "wl_display"}
+        self.configurations: dict[int, _Configuration] = {}
+        # configuration head id -> (configuration id, head object id)
+        self.configuration_heads: dict[int, tuple[int, int]] = {}
+        self.manager_id: Optional[int] = None
+
+    def send(self, object_id: int, opcode: int, signature: str = "", *args) -> None:
+        self.sock.sendall(encode_message(object_id, opcode, encode_arguments(signature, *args)))
+
+    def run(self) -> None:
+        buffer = b""
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                return
+
+            if not data:
+                return
+
+            buffer += data
+            while len(buffer) >= _HEADER.size:
+                object_id, size_opcode = _HEADER.unpack_from(buffer)
+                size = size_opcode >> 16
+                if len(buffer) < size:
+                    break
+
+                payload = buffer[_HEADER.size : size]
+                buffer = buffer[size:]
+                self.handle(object_id, size_opcode & 0xFFFF, payload)
+
+    def handle(self, object_id: int, opcode: int, payload: bytes) -> None:
+        interface = self.objects[object_id]
+        name, signature = _REQUESTS[interface][opcode]
+        getattr(self, f"{interface}_{name}")(object_id, *decode_arguments(signature, payload))
+
+    def wl_display_sync(self, _: int, callback_id: int) -> None:
+        self.send(callback_id, 0, "u", self.compositor.serial)
+        self.send(DISPLAY_ID, 1, "u", callback_id)
+
+    def wl_display_get_registry(self, _: int, registry_id: int) -> None:
+        self.objects[registry_id] = "wl_registry"
+        self.send(registry_id, 0, "usu", 1, "wl_compositor", 5)
+        self.send(registry_id, 0, "usu", _MANAGER_GLOBAL, OUTPUT_MANAGER_INTERFACE, 4)
+
+    def wl_registry_bind(self, _: int, name: int, interface: str, __: int, new_id: int) -> None:
+        assert name == _MANAGER_GLOBAL and interface == OUTPUT_MANAGER_INTERFACE
+        self.objects[new_id] = interface
+        self.manager_id = new_id
+        for head in self.compositor.heads:
+            self.send(new_id, 0, "n", head.object_id)
+            self.send(head.object_id, 0, "s", head.name)
+            self.send(head.object_id, 10, "s", head.make)
+            self.send(head.object_id, 11, "s", head.model)
+            self.send(head.object_id, 12, "s", head.serial)
+            for mode in head.modes:
+                self.send(head.object_id, 3, "n", mode.object_id)
+                self.send(mode.object_id, 0, "ii", mode.width, mode.height)
+                self.send(mode.object_id, 1, "i", mode.refresh)
+                if mode.preferred:
+                    self.send(mode.object_id, 2)
+
+            self.send_head_state(head)
+
+        self.send(new_id, 1, "u", self.compositor.serial)
+
+    def send_head_state(self, head: FakeHead) -> None:
+        self.send(head.object_id, 4, "i", int(head.enabled))
+        if head.enabled:
+            self.send(head.object_id, 5, "o", head.modes[head.current].object_id)
+            self.send(head.object_id, 6, "ii", head.x, head.y)
+            self.send(head.object_id, 7, "i", head.transform)
+            self.send(head.object_id, 8, "f", head.scale)
+
+    def zwlr_output_manager_v1_create_configuration(self, _: int, new_id: int, serial: int) -> None:
+        self.objects[new_id] = "zwlr_output_configuration_v1"
+        self.configurations[new_id] = _Configuration(serial)
+
+    def zwlr_output_manager_v1_stop(self, _: int) -> None:
+        pass
+
+    def zwlr_output_configuration_v1_enable_head(
+        self,
+        configuration_id: int,
+        new_id: int,
+        head_id: int,
+    ) -> None:
+        self.objects[new_id] = "zwlr_output_configuration_head_v1"
+        self.configuration_heads[new_id] = (configuration_id, head_id)
+        self.configurations[configuration_id].heads[head_id] = {}
+
+    def zwlr_output_configuration_v1_disable_head(
+        self,
+        configuration_id: int,
+        head_id: int,
+    ) -> None:
+        self.configurations[configuration_id].heads[head_id] = None
+
+    def zwlr_output_configuration_v1_apply(self, configuration_id: int) -> None:
+        self.finish(configuration_id, apply=True)
+
+    def zwlr_output_configuration_v1_test(self, configuration_id: int) -> None:
+        self.finish(configuration_id, apply=False)
+
+    def zwlr_output_configuration_v1_destroy(self, configuration_id: int) -> None:
+        del self.configurations[configuration_id]
+        self.objects.pop(configuration_id)
+
+    def _requested(self, configuration_head_id: int) -> dict:
+        configuration_id, head_id = self.configuration_heads[configuration_head_id]
+        return self.configurations[configuration_id].heads[head_id]
+
+    def zwlr_output_configuration_head_v1_set_mode(self, object_id: int, mode_id: int) -> None:
+        self._requested(object_id)["mode"] = mode_id
+
+    def zwlr_output_configuration_head_v1_set_custom_mode(
+        self,
+        object_id: int,
+        width: int,
+        height: int,
+        refresh: int,
+    ) -> None:
+        self._requested(object_id)["custom_mode"] = (width, height, refresh)
+
+    def zwlr_output_configuration_head_v1_set_position(
+        self,
+        object_id: int,
+        x: int,
+        y: int,
+    ) -> None:
+        self._requested(object_id).update(x=x, y=y)
+
+    def zwlr_output_configuration_head_v1_set_transform(
+        self,
+        object_id: int,
+        transform: int,
+    ) -> None:
+        self._requested(object_id)["transform"] = transform
+
+    def zwlr_output_configuration_head_v1_set_scale(self, object_id: int, scale: float) -> None:
+        self._requested(object_id)["scale"] = scale
+
+    def finish(self, configuration_id: int, apply: bool) -> None:
+        compositor = self.compositor
+        configuration = self.configurations[configuration_id]
+        heads = {head.object_id: deepcopy(head) for head in compositor.heads}
+        ok = (
+            not compositor.fail
+            and configuration.serial == compositor.serial
+            and set(configuration.heads) == set(heads)
+            and all(
+                _configure(heads[head_id], requested)
+                for head_id, requested in configuration.heads.items()
+            )
+        )
+        if not ok:
+            self.send(configuration_id, 1)
+            return
+
+        if not apply:
+            self.send(configuration_id, 0)
+            return
+
+        compositor.heads[:] = heads.values()
+        compositor.serial += 1
+        compositor.applied += 1
+        self.send(configuration_id, 0)
+        for head in compositor.heads:
+            self.send_head_state(head)
+
+        self.send(self.manager_id, 1, "u", compositor.serial)
+
+
+def _configure(head: FakeHead, requested: Optional[dict]) -> bool:
+    if requested is None:
+        head.enabled = False
+        return True
+
+    head.enabled = True
+    if "custom_mode" in requested:
+        # only the advertised modes are supported
+        return False
+
+    if "mode" in requested:
+        ids = [mode.object_id for mode in head.modes]
+        if requested["mode"] not in ids:
+            return False
+
+        head.current = ids.index(requested["mode"])
+
+    head.x = requested.get("x", head.x)
+    head.y = requested.get("y", head.y)
+    head.transform = requested.get("transform", head.transform)
+    head.scale = requested.get("scale", head.scale)
+    return True
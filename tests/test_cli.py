@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from wayrandr.backend.wlr_randr import WlrRandrBackend
+from wayrandr.cli import _read_json, main
+from wayrandr.diff import ConfigDiff, Property
+from wayrandr.monitor import (
+    Mode,
+    Monitor,
+    Position,
+    Transform,
+    compare_monitors,
+    get_monitors,
+    parse_monitors,
+)
+
+
+def current() -> list[Monitor]:
+    return [
+        Monitor(
+            name="DP-1",
+            make="Dell Inc.",
+            model="DELL U2720Q",
+            serial="12345",
+            enabled=True,
+            scale=1.0,
+            position=Position(x=1504, y=0),
+            modes=[
+                Mode(3840, 2160, 60.0, preferred=True, current=True),
+                Mode(1920, 1080, 60.0, preferred=False, current=False),
+            ],
+        ),
+    ]
+
+
+def read(tmp_path, outputs) -> Monitor:
+    path = tmp_path / "outputs.json"
+    path.write_text(json.dumps(outputs))
+    return _read_json(str(path), current())[0]
+
+
+def test_read_json_sets_everything(tmp_path):
+    monitor = read(
+        tmp_path,
+        [
+            {
+                "name": "DP-1",
+                "enabled": True,
+                "modes": [{"width": 1920, "height": 1080, "refresh": 60.0, "current": True}],
+                "position": {"x": 0, "y": 1200},
+                "transform": "90",
+                "scale": 2,
+            },
+        ],
+    )
+
+    assert monitor.active_mode.width == 1920
+    assert (monitor.position.x, monitor.position.y) == (0, 1200)
+    assert monitor.transform == Transform.normal_90
+    assert monitor.scale == 2.0
+
+
+def test_read_json_keeps_missing_fields(tmp_path):
+    monitor = read(tmp_path, [{"name": "DP-1", "scale": 1.5}])
+
+    assert monitor.enabled
+    assert monitor.active_mode.width == 3840
+    assert (monitor.position.x, monitor.position.y) == (1504, 0)
+    assert monitor.scale == 1.5
+
+
+def test_read_json_disables(tmp_path):
+    assert not read(tmp_path, [{"name": "DP-1", "enabled": False}]).enabled
+
+
+def test_read_json_rejects_unsupported_mode(tmp_path):
+    mode = {"width": 1280, "height": 720, "refresh": 60.0, "current": True}
+
+    with pytest.raises(ValueError, match="doesn't support mode 1280x720"):
+        read(tmp_path, [{"name": "DP-1", "modes": [mode]}])
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", '{"name": "DP-1"}', '[{"name": "DP-1",', '[{"name": "DP-1", "enabled": "yes"}]'],
+)
+def test_read_json_rejects_malformed(tmp_path, text):
+    path = tmp_path / "outputs.json"
+    path.write_text(text)
+
+    with pytest.raises(ValueError):
+        _read_json(str(path), current())
+
+
+HEADLESS = {"name": "HEADLESS-1", "make": None, "model": None, "enabled": True, "modes": []}
+
+
+def test_modeless_output_list_and_diff(state, tmp_path, capsys):
+    state.write_text(json.dumps([HEADLESS]))
+    target = tmp_path / "target.json"
+    target.write_text(json.dumps([{"name": "HEADLESS-1", "position": {"x": 100, "y": 0}}]))
+
+    assert main(["list"]) == 0
+    assert main(["list", "--json"]) == 0
+    assert main(["diff", str(target)]) == 0
+    assert main(["apply", str(target)]) == 0
+
+    out = capsys.readouterr().out
+    assert "  no modes\n" in out
+    assert "HEADLESS-1: position 100,0\n" in out
+    assert get_monitors()[0].position.x == 100
+
+
+def test_modeless_output_kanshi_and_presets(state, tmp_path):
+    state.write_text(json.dumps([HEADLESS]))
+    config = tmp_path / "kanshi"
+    presets = str(tmp_path / "presets.json")
+
+    assert main(["save", "--config", str(config), "--profile", "headless"]) == 0
+    assert main(["preset", "--presets", presets, "save", "headless"]) == 0
+    assert main(["preset", "--presets", presets, "apply"]) == 0
+
+    assert "output HEADLESS-1 enable position 0,0 scale 1.0 transform normal" in config.read_text()
+
+
+def test_modeless_output_compare():
+    old = parse_monitors([HEADLESS])
+    new = parse_monitors([{**HEADLESS, "enabled": False}])
+
+    assert not compare_monitors(old, parse_monitors([HEADLESS]))
+    assert compare_monitors(old, new).changed == new
+    assert ConfigDiff.between(old, new).outputs["HEADLESS-1"].changed == {Property.enabled}
+    turned_on = ConfigDiff.between(new, old).outputs["HEADLESS-1"]
+    assert turned_on.changed == set(Property)
+    assert WlrRandrBackend._output_arguments(turned_on.monitor, turned_on.changed) == [
+        "--output",
+        "HEADLESS-1",
+        "--on",
+        "--pos",
+        "0,0",
+        "--transform",
+        "normal",
+        "--scale",
+        "1.0",
+    ]
@@ -0,0 +1,129 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wayrandr.command import (
+    Command,
+    CommandError,
+    CommandResult,
+    CommandStats,
+    cancel_all,
+    command_stats,
+    run_command,
+)
+
+
+def stats(program: str) -> CommandStats:
+    return command_stats().get(program, CommandStats())
+
+
+def test_run():
+    result = run_command(["sh", "-c", "echo out; echo err >&2"])
+
+    assert result.ok
+    assert (result.stdout, result.stderr) == ("out\n", "err\n")
+    assert result.check() is result
+
+
+def test_run_bytes():
+    assert run_command(["echo", "out"], text=False).stdout == b"out\n"
+
+
+def test_failure():
+    result = run_command(["sh", "-c", "echo broken >&2; exit 3"])
+
+    assert not result.ok
+    assert result.returncode == 3
+    with pytest.raises(CommandError, match=r"^broken$") as error:
+        result.check()
+
+    assert error.value.result is result
+
+
+def test_failure_without_stderr():
+    with pytest.raises(CommandError, match="false exited with 1"):
+        run_command(["false"]).check()
+
+
+def test_timeout():
+    started = time.perf_counter()
+
+    # the shell's child must be killed as well, it holds the pipes open
+    result = run_command(["sh", "-c", "sleep 5; echo late"], timeout=0.1)
+
+    assert time.perf_counter() - started < 4
+    assert result.timed_out and not result.ok
+    assert result.error_message() == "sh timed out after 0.1 s"
+
+
+def test_missing_binary():
+    with pytest.raises(CommandError, match="Can't run wayrandr-no-such-binary") as error:
+        run_command(["wayrandr-no-such-binary"])
+
+    # handled like any other missing binary
+    assert isinstance(error.value, OSError)
+    assert error.value.result is None
+
+
+def run_cancelled(command: Command, cancel: Callable[[], None]) -> CommandResult:
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(command.run)
+        # cancelling before the process is started would make run() refuse to start it,
+        # keep cancelling until run() returns
+        while not future.done():
+            if command._process is not None:
+                cancel()
+
+            time.sleep(0.01)
+
+        return future.result()
+
+
+def test_cancel_from_another_thread():
+    command = Command(["sleep", "5"], timeout=10)
+
+    result = run_cancelled(command, command.cancel)
+
+    assert result.cancelled and not result.timed_out
+    assert result.duration_ms < 4000
+    assert result.error_message() == "sleep was cancelled"
+
+
+def test_cancel_all():
+    result = run_cancelled(Command(["sleep", "5"], timeout=10), cancel_all)
+
+    assert result.cancelled
+    assert result.duration_ms < 4000
+
+
+def test_cancel_before_run():
+    command = Command(["true"])
+    command.cancel()
+
+    with pytest.raises(CommandError, match="true was cancelled"):
+        command.run()
+
+
+def test_stats():
+    before = stats("sh")
+
+    run_command(["sh", "-c", "exit 0"])
+    run_command(["sh", "-c", "exit 1"])
+    run_command(["sh", "-c", "sleep 5"], timeout=0.1)
+
+    after = stats("sh")
+    assert after.calls - before.calls == 3
+    assert after.failures - before.failures == 2
+    assert after.timeouts - before.timeouts == 1
+    assert after.total_ms - before.total_ms >= 100
+    assert after.max_ms >= 100
+    assert 0 < after.mean_ms <= after.max_ms
+    # a copy, not the live counters
+    after.calls = 0
+    assert stats("sh").calls > 0
+
+
+def test_stats_empty():
+    assert CommandStats().mean_ms == 0.0
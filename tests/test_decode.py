@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from scripts.decode_benchmark import output
+from wayrandr.monitor import (
+    MonitorDecodeError,
+    Transform,
+    decode_monitors,
+    monitor_to_json,
+)
+
+VALID = {
+    "laptop": [output(0, 24)],
+    "workstation": [output(index, 60) for index in range(4)],
+    "video wall": [output(index, 400) for index in range(16)],
+    "no outputs": [],
+    # headless outputs and old wlr-randr versions leave these out or null
+    "optional fields": [
+        {"name": "HEADLESS-1", "make": None, "model": None, "enabled": True, "modes": []},
+    ],
+    "missing modes": [{"name": "HEADLESS-1", "enabled": True}],
+    "missing enabled": [{"name": "DP-1", "modes": []}],
+}
+
+MALFORMED = {
+    "empty output": "",
+    "whitespace": " \n",
+    "invalid json": '[{"name": "DP-1",',
+    "not a list": '{"name": "DP-1"}',
+    "output is not an object": '["DP-1"]',
+    "missing name": '[{"enabled": true}]',
+    "modes are not a list": '[{"name": "DP-1", "modes": {}}]',
+    "mode width is text": '[{"name": "DP-1", "modes": [{"width": "1920", "height": 1080}]}]',
+    "mode without refresh": '[{"name": "DP-1", "modes": [{"width": 1920, "height": 1080}]}]',
+    "enabled is a number": '[{"name": "DP-1", "enabled": 1}]',
+    "unknown transform": '[{"name": "DP-1", "transform": "45"}]',
+}
+
+
+@pytest.mark.parametrize("outputs", VALID.values(), ids=VALID.keys())
+def test_decode_round_trip(outputs):
+    text = json.dumps(outputs)
+    monitors = decode_monitors(text)
+
+    assert [monitor.name for monitor in monitors] == [output["name"] for output in outputs]
+    # decoding what monitor_to_json produced must give the same monitors
+    assert decode_monitors(json.dumps([monitor_to_json(m) for m in monitors])) == monitors
+    # bytes are decoded the same as str
+    assert decode_monitors(text.encode()) == monitors
+
+
+def test_decode_fields():
+    monitor = decode_monitors(json.dumps([output(1, 8)]))[0]
+
+    assert monitor.description == "Make Model 1 SN0001"
+    assert monitor.enabled
+    assert monitor.scale == 1.5
+    assert (monitor.position.x, monitor.position.y) == (1920, 0)
+    assert monitor.transform == Transform.normal_90
+    assert len(monitor.modes) == 8
+    assert str(monitor.active_mode) == "672x498@143.998Hz"
+
+
+def test_decode_missing_modes():
+    monitor = decode_monitors(json.dumps(VALID["missing modes"]))[0]
+
+    assert monitor.modes == []
+    assert len(monitor.mode_table) == 0
+
+
+def test_decode_missing_enabled():
+    assert not decode_monitors(json.dumps(VALID["missing enabled"]))[0].enabled
+
+
+@pytest.mark.parametrize("text", MALFORMED.values(), ids=MALFORMED.keys())
+def test_decode_rejects_malformed(text):
+    with pytest.raises(MonitorDecodeError):
+        decode_monitors(text)
@@ -0,0 +1,79 @@
+from copy import deepcopy
+
+from wayrandr.diff import ConfigDiff, MonitorDiff, Property
+from wayrandr.monitor import Mode, Monitor, Position, Transform
+
+
+def monitor(name: str, enabled: bool = True) -> Monitor:
+    return Monitor(
+        name=name,
+        make="Make",
+        model="Model",
+        serial=name,
+        enabled=enabled,
+        scale=1.0,
+        position=Position(x=0, y=0),
+        modes=[
+            Mode(1920, 1080, 60.0, preferred=True, current=True),
+            Mode(1280, 720, 60.0, preferred=False, current=False),
+        ],
+    )
+
+
+def test_changed_properties():
+    initial = monitor("DP-1")
+    edited = deepcopy(initial)
+    edited.active_mode = edited.modes[1]
+    edited.transform = Transform.normal_90
+
+    diff = MonitorDiff.between(initial, edited)
+
+    assert diff.monitor is edited
+    assert diff.changed == {Property.mode, Property.transform}
+
+
+def test_turning_on_sends_everything():
+    initial = monitor("DP-1", enabled=False)
+    edited = deepcopy(initial)
+    edited.enabled = True
+
+    assert MonitorDiff.between(initial, edited).changed == set(Property)
+
+
+def test_turning_off_sends_only_enabled():
+    initial = monitor("DP-1")
+    edited = deepcopy(initial)
+    edited.enabled = False
+
+    assert MonitorDiff.between(initial, edited).changed == {Property.enabled}
+
+
+def test_new_output_is_fully_changed():
+    initial = [monitor("eDP-1")]
+    edited = [*deepcopy(initial), monitor("DP-1")]
+
+    diff = ConfigDiff.between(initial, edited)
+
+    assert list(diff.outputs) == ["DP-1"]
+    assert diff.outputs["DP-1"].changed == set(Property)
+
+
+def test_unchanged_outputs_are_left_out():
+    initial = [monitor("eDP-1"), monitor("DP-1"), monitor("DP-2")]
+    edited = deepcopy(initial)
+    edited[2].scale = 1.5
+
+    diff = ConfigDiff.between(initial, edited)
+
+    assert list(diff.outputs) == ["DP-2"]
+    assert diff.monitors == [edited[2]]
+    assert diff.outputs["DP-2"].changed == {Property.scale}
+
+
+def test_no_changes():
+    initial = [monitor("eDP-1"), monitor("DP-1")]
+
+    diff = ConfigDiff.between(initial, deepcopy(initial))
+
+    assert not diff
+    assert diff.monitors == []
@@ -0,0 +1,247 @@
+from copy import deepcopy
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from wayrandr.backend import kanshi as kanshi_backend
+from wayrandr.backend.kanshi import KanshiBackend
+from wayrandr.diff import ConfigDiff
+from wayrandr.kanshi import KanshiParseError, ProfileIndex, apply_profile, load, parse
+from wayrandr.monitor import Mode, Monitor, Position
+
+
+def monitors() -> list[Monitor]:
+    return [
+        Monitor(
+            name="eDP-1",
+            make="BOE",
+            model="0x0BCA",
+            serial=None,
+            enabled=True,
+            scale=1.5,
+            position=Position(x=0, y=0),
+            modes=[Mode(2256, 1504, 59.999, preferred=True, current=True)],
+        ),
+        Monitor(
+            name="DP-1",
+            make="Dell Inc.",
+            model="DELL U2720Q",
+            serial="12345",
+            enabled=True,
+            scale=1.0,
+            position=Position(x=1504, y=0),
+            modes=[Mode(3840, 2160, 60.0, preferred=True, current=True)],
+        ),
+    ]
+
+
+def moved_external() -> ConfigDiff:
+    edited = monitors()
+    edited[1].position.x = 2000
+    return ConfigDiff.between(monitors(), edited)
+
+
+def test_save_diff_new_profile_lists_every_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(kanshi_backend, "get_monitors", monitors)
+    path = tmp_path / "config"
+
+    KanshiBackend("docked", path).save_diff(moved_external())
+
+    profile = load(path)[0].get_profile("docked")
+    outputs = {output.criteria: output.directives for output in profile.outputs}
+    assert list(outputs) == ["eDP-1", "Dell Inc. DELL U2720Q 12345"]
+    assert outputs["eDP-1"][outputs["eDP-1"].index("position") + 1] == "0,0"
+    directives = outputs["Dell Inc. DELL U2720Q 12345"]
+    assert directives[directives.index("position") + 1] == "2000,0"
+
+
+def test_save_diff_existing_profile_keeps_other_outputs(tmp_path, monkeypatch):
+    def no_compositor():
+        raise AssertionError("the existing profile is enough")
+
+    monkeypatch.setattr(kanshi_backend, "get_monitors", no_compositor)
+    path = tmp_path / "config"
+    source = (
+        "profile docked {\n"
+        "  # the laptop panel\n"
+        "  output eDP-1 enable scale 1.5\n"
+        '  output "Dell Inc. DELL U2720Q 12345" enable position 1504,0\n'
+        "}\n"
+    )
+    path.write_text(source)
+
+    KanshiBackend("docked", path).save_diff(moved_external())
+
+    text = path.read_text()
+    assert "  # the laptop panel\n  output eDP-1 enable scale 1.5\n" in text
+    assert "position 2000,0" in text
+    assert len(parse(text).get_profile("docked").outputs) == 2
+
+
+def test_save_diff_without_changes_writes_nothing(tmp_path):
+    path = tmp_path / "config"
+
+    KanshiBackend("docked", path).save_diff(ConfigDiff.between(monitors(), deepcopy(monitors())))
+
+    assert not path.exists()
+
+
+def test_load_follows_includes_once(tmp_path):
+    (tmp_path / "outputs").mkdir()
+    (tmp_path / "outputs" / "a").write_text("include ../b\nprofile a {\n  output DP-1\n}\n")
+    (tmp_path / "b").write_text("include ./outputs/*\nprofile b {\n  output DP-2\n}\n")
+    (tmp_path / "config").write_text("include outputs/*\ninclude b\n")
+
+    configs = load(tmp_path / "config")
+
+    assert [Path(config.path).name for config in configs] == ["config", "a", "b"]
+
+
+def monitor(name: str, model: str = "Model", serial: Optional[str] = None) -> Monitor:
+    return Monitor(
+        name=name,
+        make="Make",
+        model=model,
+        serial=serial,
+        enabled=True,
+        scale=1.0,
+        position=Position(x=0, y=0),
+        modes=[Mode(1920, 1080, 60.0, preferred=True, current=True)],
+    )
+
+
+INDEXED = """
+profile laptop {
+  output eDP-1
+}
+profile docked {
+  output eDP-1 disable
+  output "Make Dock 42"
+}
+profile docked-any {
+  output eDP-1
+  output *
+}
+profile two-any {
+  output *
+  output *
+}
+profile twins {
+  output "Make Twin Unknown"
+  output "Make Twin Unknown"
+}
+"""
+
+
+def match(*monitors: Monitor) -> Optional[str]:
+    profile = ProfileIndex.from_configs([parse(INDEXED)]).match(list(monitors))
+    return None if profile is None else profile.name
+
+
+def test_index_exact_match():
+    assert match(monitor("eDP-1")) == "laptop"
+
+
+def test_index_first_profile_wins():
+    # docked-any and two-any match as well, but come later
+    assert match(monitor("eDP-1"), monitor("DP-1", "Dock", "42")) == "docked"
+
+
+def test_index_wildcards():
+    assert match(monitor("eDP-1"), monitor("DP-2")) == "docked-any"
+    assert match(monitor("DP-1"), monitor("DP-2")) == "two-any"
+
+
+def test_index_extra_connected_outputs():
+    assert match(monitor("eDP-1"), monitor("DP-1"), monitor("DP-2")) is None
+    assert match(monitor("HDMI-A-1")) is None
+
+
+def test_index_duplicate_criteria():
+    twins = [monitor("DP-1", "Twin"), monitor("DP-2", "Twin")]
+    index = ProfileIndex([parse(INDEXED).get_profile("twins")])
+
+    profile = index.match(twins)
+    assert profile is not None and profile.name == "twins"
+    assert [m.enabled for m in apply_profile(profile, twins)] == [True, True]
+    # both statements can't take the same monitor
+    assert index.match(twins[:1]) is None
+    assert index.match([*twins, monitor("DP-3", "Twin")]) is None
+
+
+def test_index_empty():
+    assert ProfileIndex([]).match([monitor("eDP-1")]) is None
+
+
+SOURCE = """# laptop only
+output eDP-1 {
+    mode 2256x1504@59.999Hz
+    scale 1.5
+}
+
+include ~/.config/kanshi/extra  # machine specific
+
+profile docked {
+	output eDP-1 disable   # lid closed
+	output "Dell Inc. DELL U2720Q 12345" enable mode 3840x2160 \\
+		position 0,0 scale 1
+	exec notify-send "docked" && swaymsg 'workspace 1'
+}
+
+profile {
+  output * enable
+}
+"""
+
+
+def test_render_unchanged():
+    assert parse(SOURCE).render() == SOURCE
+
+
+def test_parsed_structure():
+    config = parse(SOURCE)
+
+    assert config.statements[0].directives == ["mode", "2256x1504@59.999Hz", "scale", "1.5"]
+    assert config.includes[0].path == "~/.config/kanshi/extra"
+    docked = config.get_profile("docked")
+    assert [output.criteria for output in docked.outputs] == [
+        "eDP-1",
+        "Dell Inc. DELL U2720Q 12345",
+    ]
+    assert docked.outputs[1].directives[-2:] == ["scale", "1"]
+    assert docked.execs[0].command == "notify-send \"docked\" && swaymsg 'workspace 1'"
+    assert config.profiles[1].name is None
+
+
+def test_render_edited_output_only():
+    config = parse(SOURCE)
+    config.get_profile("docked").outputs[0].directives = ["enable", "scale", "2"]
+
+    expected = SOURCE.replace("output eDP-1 disable   #", "output eDP-1 enable scale 2   #")
+    assert config.render() == expected
+
+
+def test_render_renamed_profile():
+    config = parse(SOURCE)
+    config.get_profile("docked").name = "at desk"
+
+    assert config.render() == SOURCE.replace("profile docked {", 'profile "at desk" {')
+
+
+@pytest.mark.parametrize(
+    ("source", "line", "message"),
+    [
+        ('profile {\n  output "DP-1 enable\n}\n', 2, "Unterminated quoted string"),
+        ("profile a {\n  output DP-1\n\n", 4, "Expected } closing profile"),
+        ("output DP-1 {\n  enable\n", 3, "Expected } closing output block"),
+        ("profile a {\n  output DP-1\n  monitor DP-2\n}\n", 3, "Unknown profile directive"),
+        ("\n\nmonitor DP-2\n", 3, "Unknown directive"),
+    ],
+)
+def test_parse_error_line(source, line, message):
+    with pytest.raises(KanshiParseError, match=message) as error:
+        parse(source, "config")
+
+    assert error.value.line == line
+    assert str(error.value).startswith(f"config:{line}: ")
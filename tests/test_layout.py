@@ -0,0 +1,119 @@
+import pytest
+
+from wayrandr.layout import Edge, Layout, canvas_size, logical_size
+from wayrandr.monitor import Mode, Monitor, MonitorSnapshot, Position, Transform
+from wayrandr.snapping import Rect
+
+
+def monitor(
+    name: str,
+    x: int = 0,
+    y: int = 0,
+    size: tuple[int, int] = (1920, 1080),
+    scale: float = 1.0,
+    transform: Transform = Transform.normal,
+    enabled: bool = True,
+) -> Monitor:
+    return Monitor(
+        name=name,
+        make="Make",
+        model="Model",
+        serial=name,
+        enabled=enabled,
+        scale=scale,
+        position=Position(x=x, y=y),
+        modes=[Mode(*size, 60.0, preferred=True, current=True)],
+        transform=transform,
+    )
+
+
+@pytest.mark.parametrize(
+    ("scale", "transform", "expected"),
+    [
+        (1.0, Transform.normal, (2256, 1504)),
+        (1.5, Transform.normal, (1504, 1003)),
+        (1.0, Transform.normal_90, (1504, 2256)),
+        (2.0, Transform.flipped_270, (752, 1128)),
+        (1.0, Transform.flipped_180, (2256, 1504)),
+    ],
+)
+def test_logical_size(scale, transform, expected):
+    laptop = monitor("eDP-1", size=(2256, 1504), scale=scale, transform=transform)
+
+    assert logical_size(laptop) == expected
+
+
+def test_canvas_size():
+    assert canvas_size(monitor("DP-1")) == (192, 108)
+
+
+def test_rect_and_canvas_rect():
+    layout = Layout(MonitorSnapshot([monitor("DP-1", x=1504, y=-200)]))
+
+    assert layout.rect("DP-1") == Rect(1504, -200, 1920, 1080)
+    assert layout.canvas_rect("DP-1") == Rect(150, -20, 192, 108)
+
+
+def test_snap():
+    layout = Layout(MonitorSnapshot([monitor("eDP-1"), monitor("DP-1", x=5000)]))
+
+    assert layout.snap("DP-1", 1925, 4) == Rect(1920, 0, 1920, 1080)
+    assert layout.monitors["DP-1"].position == Position(x=1920, y=0)
+
+
+def test_snap_ignores_own_edges():
+    layout = Layout(MonitorSnapshot([monitor("DP-1")]))
+
+    assert layout.snap("DP-1", 7, 3) == Rect(7, 3, 1920, 1080)
+
+
+def test_normalize():
+    layout = Layout(
+        MonitorSnapshot(
+            [
+                monitor("eDP-1", x=-1920, y=300),
+                monitor("DP-1", x=0, y=-100),
+                # disabled outputs don't count, but move with the rest
+                monitor("DP-2", x=-5000, y=-5000, enabled=False),
+            ],
+        ),
+    )
+
+    layout.normalize()
+
+    assert layout.monitors["eDP-1"].position == Position(x=0, y=400)
+    assert layout.monitors["DP-1"].position == Position(x=1920, y=0)
+    assert layout.monitors["DP-2"].position == Position(x=-3080, y=-4900)
+
+
+def test_normalize_empty():
+    layout = Layout(MonitorSnapshot([monitor("DP-1", x=10, enabled=False)]))
+
+    layout.normalize()
+
+    assert layout.monitors["DP-1"].position == Position(x=10, y=0)
+
+
+@pytest.mark.parametrize(
+    ("edge", "expected"),
+    [
+        (Edge.left, (100, 2000)),
+        (Edge.right, (740, 2000)),
+        (Edge.top, (3000, -50)),
+        (Edge.bottom, (3000, 206)),
+    ],
+)
+def test_align(edge, expected):
+    layout = Layout(
+        MonitorSnapshot(
+            [
+                monitor("eDP-1", x=100, y=-50, size=(1920, 1080)),
+                monitor("DP-1", x=3000, y=2000, size=(1280, 824)),
+            ],
+        ),
+    )
+
+    rect = layout.align("DP-1", "eDP-1", edge)
+
+    assert (rect.x, rect.y) == expected
+    assert layout.monitors["DP-1"].position == Position(*expected)
@@ -0,0 +1,157 @@
+from wayrandr.monitor import Mode, ModeTable, Monitor, Position
+
+
+def mode(width: int, height: int, refresh: float, preferred: bool = False) -> Mode:
+    return Mode(width, height, refresh, preferred=preferred, current=False)
+
+
+def modes() -> list[Mode]:
+    # in the order compositors tend to report them, the preferred one isn't the biggest
+    return [
+        mode(1920, 1080, 60.0, preferred=True),
+        mode(1920, 1080, 143.998),
+        mode(2560, 1440, 59.951),
+        mode(1920, 1200, 59.95),
+        mode(1280, 720, 60.0),
+        mode(1920, 1080, 119.982),
+        mode(2560, 1440, 143.973),
+    ]
+
+
+def test_sorted_by_resolution_then_refresh():
+    table = ModeTable(modes())
+
+    assert [str(m) for m in table] == [
+        "2560x1440@143.973Hz",
+        "2560x1440@59.951Hz",
+        "1920x1200@59.95Hz",
+        "1920x1080@143.998Hz",
+        "1920x1080@119.982Hz",
+        "1920x1080@60.0Hz",
+        "1280x720@60.0Hz",
+    ]
+    assert table.resolutions() == [(2560, 1440), (1920, 1200), (1920, 1080), (1280, 720)]
+    assert [m.refresh for m in table.refresh_rates(1920, 1080)] == [143.998, 119.982, 60.0]
+    assert table.refresh_rates(800, 600) == []
+
+
+def test_get():
+    source = modes()
+    table = ModeTable(source)
+
+    assert table.get(1920, 1080, 119.982) is source[5]
+    assert table.get(1920, 1080, 120.0) is None
+    assert mode(1280, 720, 60.0) in table
+    assert mode(1280, 720, 30.0) not in table
+
+
+def test_best_refresh():
+    table = ModeTable(modes())
+
+    assert table.best_refresh(1920, 1080).refresh == 143.998
+    assert table.best_refresh(1920, 1200).refresh == 59.95
+    assert table.best_refresh(3840, 2160) is None
+
+
+def test_closest():
+    table = ModeTable(modes())
+
+    assert str(table.closest(1920, 1080, 120.0)) == "1920x1080@119.982Hz"
+    # the highest refresh rate without one asked for
+    assert str(table.closest(1920, 1080)) == "1920x1080@143.998Hz"
+    # unknown resolution, the nearest one
+    assert str(table.closest(2560, 1600, 60.0)) == "2560x1440@59.951Hz"
+    assert str(table.closest(1366, 768)) == "1280x720@60.0Hz"
+
+
+def test_preferred():
+    source = modes()
+
+    assert ModeTable(source).preferred() is source[0]
+    assert ModeTable(source[1:]).preferred() is None
+
+
+def test_position_of_duplicates():
+    # some drivers list a mode twice, with different flags
+    source = [mode(1920, 1080, 60.0), mode(1280, 720, 60.0), mode(1920, 1080, 60.0, True)]
+    table = ModeTable(source)
+
+    assert len(table) == 2
+    assert table.position(source[2]) == 0
+    assert table.get(1920, 1080, 60.0) is source[0]
+    assert table.position(mode(800, 600, 60.0)) is None
+
+
+def test_empty():
+    table = ModeTable([])
+
+    assert len(table) == 0
+    assert list(table) == []
+    assert table.resolutions() == []
+    assert table.get(1920, 1080, 60.0) is None
+    assert table.best_refresh(1920, 1080) is None
+    assert table.closest(1920, 1080, 60.0) is None
+    assert table.preferred() is None
+
+
+def test_built_from():
+    source = modes()
+    table = ModeTable(source)
+
+    assert table.built_from(source)
+    # equal modes in another list are not the same source
+    assert not table.built_from(modes())
+
+    source[4] = mode(3840, 2160, 60.0)
+    assert not table.built_from(source)
+
+    source = modes()
+    table = ModeTable(source)
+    source.append(mode(3840, 2160, 60.0))
+    assert not table.built_from(source)
+
+    # the table keeps answering from the modes it was built from
+    assert table.get(3840, 2160, 60.0) is None
+    assert len(table) == 7
+
+
+def monitor() -> Monitor:
+    return Monitor(
+        name="DP-1",
+        make="Make",
+        model="Model",
+        serial=None,
+        enabled=True,
+        scale=1.0,
+        position=Position(x=0, y=0),
+        modes=modes(),
+    )
+
+
+def test_monitor_rebuilds_mode_table():
+    output = monitor()
+    table = output.mode_table
+
+    assert output.mode_table is table
+
+    output.modes.append(mode(3840, 2160, 60.0))
+    assert output.mode_table.get(3840, 2160, 60.0) is output.modes[-1]
+
+    output.modes[0] = mode(1024, 768, 60.0)
+    assert (1024, 768) in output.mode_table.resolutions()
+
+    output.modes = modes()
+    assert output.mode_table.best_refresh(3840, 2160) is None
+
+
+def test_active_mode_after_modes_changed():
+    output = monitor()
+    output.active_mode = output.modes[5]
+    assert str(output.active_mode) == "1920x1080@119.982Hz"
+
+    # the new list has the mode at another position
+    output.modes = list(reversed(modes()))
+    output.active_mode = mode(2560, 1440, 59.951)
+
+    assert output.active_mode is output.modes[4]
+    assert [m.current for m in output.modes].count(True) == 1
@@ -0,0 +1,117 @@
+from typing import Optional
+
+import pytest
+
+from wayrandr.monitor import Mode, Monitor, Position, Transform
+from wayrandr.presets import Preset, PresetError, PresetStore, fingerprint
+
+
+def monitor(name: str, model: str = "Model", serial: Optional[str] = None, x: int = 0) -> Monitor:
+    return Monitor(
+        name=name,
+        make="Make",
+        model=model,
+        serial=serial,
+        enabled=True,
+        scale=1.0,
+        position=Position(x=x, y=0),
+        modes=[
+            Mode(1920, 1080, 60.0, preferred=True, current=True),
+            Mode(1280, 720, 60.0, preferred=False, current=False),
+        ],
+    )
+
+
+def docked() -> list[Monitor]:
+    return [monitor("eDP-1", "Panel"), monitor("DP-1", "Dock", "42", x=1920)]
+
+
+def test_fingerprint_ignores_names_and_order():
+    laptop, external = docked()
+    external.name = "DP-2"
+
+    assert fingerprint([external, laptop]) == fingerprint(docked())
+    assert fingerprint(docked()[:1]) != fingerprint(docked())
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "wayrandr" / "presets.json"
+    store = PresetStore(path)
+    edited = docked()
+    edited[0].enabled = False
+    edited[1].transform = Transform.normal_90
+    store.put(Preset.from_monitors("desk", edited))
+    store.put(Preset.from_monitors("laptop", docked()[:1]))
+
+    store.save()
+    loaded = PresetStore.load(path)
+
+    assert not path.with_suffix(".tmp").exists()
+    assert [preset.name for preset in loaded.presets] == ["desk", "laptop"]
+    assert loaded.get("desk") == store.get("desk")
+    assert loaded.match(docked()).monitors == edited
+
+
+def test_load_missing_file_is_empty(tmp_path):
+    assert PresetStore.load(tmp_path / "presets.json").presets == []
+
+
+@pytest.mark.parametrize("text", ["{", "[]", '{"version": 0}', '{"version": 1}'])
+def test_load_rejects_malformed(tmp_path, text):
+    path = tmp_path / "presets.json"
+    path.write_text(text)
+
+    with pytest.raises(PresetError):
+        PresetStore.load(path)
+
+
+def test_index_after_put_and_remove(tmp_path):
+    store = PresetStore(tmp_path / "presets.json")
+    store.put(Preset.from_monitors("desk", docked()))
+    store.put(Preset.from_monitors("meeting", docked()))
+    store.put(Preset.from_monitors("laptop", docked()[:1]))
+
+    assert [preset.name for preset in store.for_monitors(docked())] == ["meeting", "desk"]
+
+    # replacing moves the preset to the fingerprint of its new monitors
+    store.put(Preset.from_monitors("meeting", docked()[:1]))
+    assert [preset.name for preset in store.for_monitors(docked())] == ["desk"]
+    assert [preset.name for preset in store.for_monitors(docked()[:1])] == ["meeting", "laptop"]
+
+    assert store.remove("desk").name == "desk"
+    assert store.remove("desk") is None
+    assert store.match(docked()) is None
+    assert store.match(docked()[:1]).name == "meeting"
+
+
+def test_apply_to_matches_by_description():
+    saved = docked()
+    saved[1].position.x = 0
+    saved[0].position.x = 3840
+    saved[0].scale = 1.5
+    saved[0].active_mode = saved[0].modes[1]
+    preset = Preset.from_monitors("desk", saved)
+    # the dock is plugged into a different port now, the unknown one is left alone
+    current = [monitor("eDP-1", "Panel"), monitor("DP-3", "Dock", "42"), monitor("HDMI-A-1", x=7)]
+
+    laptop, external, unknown = preset.apply_to(current)
+
+    assert (laptop.position.x, laptop.scale) == (3840, 1.5)
+    assert str(laptop.active_mode) == "1280x720@60.0Hz"
+    assert (external.name, external.position.x) == ("DP-3", 0)
+    assert unknown == current[2]
+    # the monitors passed in are not modified
+    assert current[0].position.x == 0
+
+
+def test_apply_to_same_description_prefers_name():
+    # same model without serial number, only the port tells them apart
+    saved = [monitor("DP-1", "Twin", x=1920), monitor("DP-2", "Twin", x=0)]
+    preset = Preset.from_monitors("twins", saved)
+
+    swapped = preset.apply_to([monitor("DP-2", "Twin"), monitor("DP-1", "Twin")])
+    assert [(m.name, m.position.x) for m in swapped] == [("DP-2", 0), ("DP-1", 1920)]
+
+    # a port the preset doesn't know takes the first one left
+    moved = preset.apply_to([monitor("DP-3", "Twin"), monitor("DP-2", "Twin")])
+    assert [(m.name, m.position.x) for m in moved] == [("DP-3", 1920), ("DP-2", 0)]
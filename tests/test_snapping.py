@@ -0,0 +1,49 @@
+import pytest
+
+from wayrandr.snapping import Rect, SnapIndex
+
+# 1920x1080 at the origin, another one below it
+STATIC = [Rect(0, 0, 1920, 1080), Rect(0, 1080, 1920, 1080)]
+
+
+def snap(rect: Rect, distance: int = 10) -> tuple[int, int]:
+    return SnapIndex(STATIC, distance=distance).snap(rect)
+
+
+def test_snap_next_to_neighbour():
+    # the left edge of the dragged one goes to the right edge of the static one
+    assert snap(Rect(1925, 3, 1280, 1024)) == (1920, 0)
+
+
+def test_snap_align_same_side_edges():
+    # left to left, top to top
+    assert snap(Rect(-6, -1084, 1920, 1080)) == (0, -1080)
+    # right to right: 1000 + 915 is 5 px short of 1920
+    assert snap(Rect(1000, 2200, 915, 500)) == (1005, 2200)
+
+
+@pytest.mark.parametrize("offset", [9, -9])
+def test_snap_within_distance(offset):
+    assert snap(Rect(1920 + offset, 500, 800, 600)) == (1920, 500)
+
+
+@pytest.mark.parametrize("offset", [10, -10, 50])
+def test_no_snap_from_distance(offset):
+    assert snap(Rect(1920 + offset, 500, 800, 600)) == (1920 + offset, 500)
+
+
+def test_snap_picks_closer_edge():
+    # the start is 5 px from x=0, the end 10 px from x=1920
+    assert snap(Rect(-5, 500, 1915, 100), distance=50) == (0, 500)
+    # the start is 12 px from x=0, the end only 2 px from x=1920
+    assert snap(Rect(-12, 500, 1930, 100), distance=50) == (-10, 500)
+
+
+def test_snap_corner():
+    assert snap(Rect(1924, 2164, 800, 600)) == (1920, 2160)
+
+
+def test_empty_index():
+    index = SnapIndex([])
+
+    assert index.snap(Rect(13, 17, 800, 600)) == (13, 17)
@@ -0,0 +1,110 @@
+from collections.abc import Iterator
+
+import pytest
+from fake_compositor import FakeCompositor, FakeHead, FakeMode
+
+from wayrandr.backend.base import ConfigurationError
+from wayrandr.backend.wlr_output_management import WlrOutputManagementBackend
+from wayrandr.diff import ConfigDiff
+from wayrandr.monitor import Mode, Transform
+from wayrandr.wayland import get_monitors
+
+
+def heads() -> list[FakeHead]:
+    return [
+        FakeHead(
+            name="eDP-1",
+            make="BOE",
+            model="0x0BCA",
+            serial=None,
+            modes=[FakeMode(2256, 1504, 59999, preferred=True), FakeMode(1920, 1200, 59999)],
+            scale=1.5,
+        ),
+        FakeHead(
+            name="DP-1",
+            make="Dell Inc.",
+            model="DELL U2720Q",
+            serial="12345",
+            modes=[FakeMode(3840, 2160, 60000, preferred=True), FakeMode(1920, 1080, 60000)],
+            x=1504,
+        ),
+    ]
+
+
+@pytest.fixture
+def compositor(tmp_path) -> Iterator[FakeCompositor]:
+    with FakeCompositor(str(tmp_path / "wayland-test"), heads()) as result:
+        yield result
+
+
+def test_read(compositor):
+    monitors = get_monitors(compositor.path)
+
+    assert [monitor.name for monitor in monitors] == ["eDP-1", "DP-1"]
+    laptop, external = monitors
+    assert laptop.description == "BOE 0x0BCA Unknown"
+    assert laptop.enabled
+    assert laptop.scale == 1.5
+    assert laptop.active_mode == Mode(2256, 1504, 59.999, preferred=True, current=True)
+    assert laptop.modes[0].preferred
+    assert external.serial == "12345"
+    assert (external.position.x, external.position.y) == (1504, 0)
+    assert external.transform == Transform.normal
+
+
+def test_apply(compositor):
+    backend = WlrOutputManagementBackend(compositor.path)
+    current = get_monitors(compositor.path)
+    wanted = get_monitors(compositor.path)
+    laptop, external = wanted
+    laptop.active_mode = laptop.modes[1]
+    external.position.x = 1920
+    external.transform = Transform.normal_90
+
+    backend.save_diff(ConfigDiff.between(current, wanted))
+
+    assert compositor.applied == 1
+    laptop, external = get_monitors(compositor.path)
+    assert laptop.active_mode.width == 1920
+    assert (external.position.x, external.position.y) == (1920, 0)
+    assert external.transform == Transform.normal_90
+    # properties the diff doesn't touch keep their value
+    assert laptop.scale == 1.5
+
+
+def test_apply_disable(compositor):
+    current = get_monitors(compositor.path)
+    wanted = get_monitors(compositor.path)
+    wanted[1].enabled = False
+
+    WlrOutputManagementBackend(compositor.path).save_diff(ConfigDiff.between(current, wanted))
+
+    assert [monitor.enabled for monitor in get_monitors(compositor.path)] == [True, False]
+
+
+def test_failed_apply(compositor):
+    compositor.fail = True
+    current = get_monitors(compositor.path)
+    wanted = get_monitors(compositor.path)
+    wanted[0].position.x = 100
+
+    with pytest.raises(ConfigurationError) as error:
+        WlrOutputManagementBackend(compositor.path).save_diff(ConfigDiff.between(current, wanted))
+
+    assert "failed" in str(error.value)
+    assert compositor.applied == 0
+    assert get_monitors(compositor.path)[0].position.x == 0
+
+
+def test_apply_without_compositor(tmp_path):
+    backend = WlrOutputManagementBackend(str(tmp_path / "wayland-missing"))
+
+    with pytest.raises(ConfigurationError, match="Can't connect"):
+        backend.save_configuration([])
+
+
+def test_apply_without_runtime_dir(monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+
+    with pytest.raises(ConfigurationError, match="XDG_RUNTIME_DIR"):
+        WlrOutputManagementBackend("wayland-0").save_configuration([])
@@ -0,0 +1,62 @@
+import subprocess
+from copy import deepcopy
+
+import pytest
+
+from wayrandr.backend.base import ConfigurationError
+from wayrandr.backend.wlr_randr import WlrRandrBackend
+from wayrandr.diff import ConfigDiff
+from wayrandr.monitor import Transform, get_monitors
+
+
+def test_read(state):
+    monitors = get_monitors(max_age=0)
+
+    assert [monitor.name for monitor in monitors] == ["eDP-1", "DP-1"]
+    assert monitors[1].description == "Dell Inc. DELL U2720Q 12345"
+    # reading doesn't create the state
+    assert not state.exists()
+
+
+def test_save_diff(state):
+    current = get_monitors(max_age=0)
+    wanted = deepcopy(current)
+    laptop, external = wanted
+    laptop.active_mode = laptop.modes[1]
+    external.position.x = 1920
+    external.transform = Transform.normal_270
+
+    WlrRandrBackend().save_diff(ConfigDiff.between(current, wanted))
+
+    # save invalidates the cached state, the default max_age reads it again
+    laptop, external = get_monitors()
+    assert str(laptop.active_mode) == "1920x1200@59.999Hz"
+    assert laptop.scale == 1.5
+    assert (external.position.x, external.position.y) == (1920, 0)
+    assert external.transform == Transform.normal_270
+    assert not ConfigDiff.between(wanted, get_monitors())
+
+
+def test_save_diff_failure(state):
+    current = get_monitors(max_age=0)
+    wanted = deepcopy(current)
+    wanted[0].position.x = 100
+    unknown = deepcopy(current[1])
+    unknown.name = "HDMI-A-1"
+    wanted.append(unknown)
+
+    with pytest.raises(ConfigurationError) as error:
+        WlrRandrBackend().save_diff(ConfigDiff.between(current, wanted))
+
+    # the dry runs tell which output broke the transaction
+    assert error.value.failures.keys() == {"HDMI-A-1"}
+    assert get_monitors()[0].position.x == 0
+
+
+def test_state_is_required(state, monkeypatch):
+    monkeypatch.delenv("FAKE_WLR_RANDR_STATE")
+
+    result = subprocess.run(["wlr-randr", "--json"], capture_output=True, text=True, check=False)
+
+    assert result.returncode == 2
+    assert "FAKE_WLR_RANDR_STATE" in result.stderr
@@ -1,9 +1,43 @@
 from abc import ABC, abstractmethod
 
+from wayrandr.diff import ConfigDiff
 from wayrandr.monitor import Monitor
 
 
+class ConfigurationError(Exception):
+    """
+    Applying the configuration failed. Nothing was applied.
+
+    `failures` maps output names to the reason why the output could not be configured.
+    """
+
+    def __init__(self, message: str, failures: dict[str, str]) -> None:
+        super().__init__(message)
+        self.failures = failures
+
+    def __str__(self) -> str:
+        details = "\n".join(f"{name}: {reason}" for name, reason in self.failures.items())
+        if not details:
+            return self.args[0]
+
+        return f"{self.args[0]}\n{details}"
+
+
 class RandrBackend(ABC):
     @abstractmethod
     def save_configuration(self, monitors: list[Monitor]) -> None:
-        pass
+        """
+        Apply configuration of all monitors at once.
+
+        Raises:
+            ConfigurationError: if the compositor rejected the configuration.
+        """
+
+    def save_diff(self, diff: ConfigDiff) -> None:
+        """
+        Apply only the changed properties of the changed monitors.
+
+        Backends that can't do partial updates send the changed monitors whole.
+        """
+        if diff:
+            self.save_configuration(diff.monitors)
@@ -0,0 +1,51 @@
+"""
+this saves the monitor dataclasses as a kanshi profile
+"""
+
+from pathlib import Path
+from typing import Optional, Union
+
+from wayrandr.backend.base import RandrBackend
+from wayrandr.diff import ConfigDiff
+from wayrandr.kanshi import KanshiConfig, default_config_path, parse, set_profile, write
+from wayrandr.monitor import Monitor, get_monitors
+
+DEFAULT_PROFILE_NAME = "wayrandr"
+
+
+class KanshiBackend(RandrBackend):
+    def __init__(
+        self,
+        profile_name: str = DEFAULT_PROFILE_NAME,
+        config_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.profile_name = profile_name
+        self.config_path = Path(config_path or default_config_path())
+
+    def _load(self) -> KanshiConfig:
+        if not self.config_path.exists():
+            return KanshiConfig(path=str(self.config_path))
+
+        return parse(self.config_path.read_text(), str(self.config_path))
+
+    def save_configuration(self, monitors: list[Monitor]) -> None:
+        # includes are left alone, the profile is always written to the main config
+        config = self._load()
+        set_profile(config, self.profile_name, monitors)
+        write(config, self.config_path)
+
+    def save_diff(self, diff: ConfigDiff) -> None:
+        if not diff:
+            return
+
+        config = self._load()
+        if config.get_profile(self.profile_name) is not None:
+            # the profile has to keep the unchanged outputs too
+            set_profile(config, self.profile_name, diff.monitors, remove_missing=False)
+        else:
+            # kanshi matches a profile only if it lists every connected output
+            changed = {monitor.name: monitor for monitor in diff.monitors}
+            monitors = [changed.pop(monitor.name, monitor) for monitor in get_monitors()]
+            set_profile(config, self.profile_name, monitors + list(changed.values()))
+
+        write(config, self.config_path)
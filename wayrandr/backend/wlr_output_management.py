@@ -0,0 +1,49 @@
+"""
+this applies the monitor dataclasses directly over the wayland socket
+via zwlr_output_manager_v1, without forking wlr-randr
+"""
+
+from collections.abc import Collection
+from typing import Optional
+
+from wayrandr.backend.base import ConfigurationError, RandrBackend
+from wayrandr.diff import ConfigDiff, Property
+from wayrandr.monitor import Monitor, output_state
+from wayrandr.wayland import OutputManager, WaylandError
+
+
+class WlrOutputManagementBackend(RandrBackend):
+    def __init__(self, display: Optional[str] = None) -> None:
+        self.display = display
+
+    def _save(
+        self,
+        monitors: list[Monitor],
+        changes: Optional[dict[str, Collection[Property]]] = None,
+    ) -> None:
+        try:
+            manager = OutputManager.connect(self.display)
+        except WaylandError as e:
+            raise ConfigurationError(f"Can't connect to the compositor: {e}", {}) from e
+
+        with manager:
+            try:
+                manager.apply(monitors, changes=changes)
+            except WaylandError as e:
+                # the protocol is all-or-nothing and doesn't tell which head failed
+                raise ConfigurationError(
+                    "Failed to apply configuration",
+                    {monitor.name: str(e) for monitor in monitors},
+                ) from e
+            finally:
+                output_state.invalidate()
+
+    def save_configuration(self, monitors: list[Monitor]) -> None:
+        self._save(monitors)
+
+    def save_diff(self, diff: ConfigDiff) -> None:
+        if diff:
+            self._save(
+                diff.monitors,
+                {name: output.changed for name, output in diff.outputs.items()},
+            )
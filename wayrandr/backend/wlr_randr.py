@@ -2,28 +2,99 @@
 this executes wlr-randr command according to the monitor dataclass
 """
 
-from subprocess import run
+from collections.abc import Collection
 
-from wayrandr.backend.base import RandrBackend
-from wayrandr.monitor import Monitor
+from wayrandr.backend.base import ConfigurationError, RandrBackend
+from wayrandr.command import CommandError, run_command
+from wayrandr.diff import ConfigDiff, Property
+from wayrandr.monitor import Monitor, output_state
 
 
 class WlrRandrBackend(RandrBackend):
+    @staticmethod
+    def _output_arguments(
+        monitor: Monitor,
+        properties: Collection[Property] = frozenset(Property),
+    ) -> list[str]:
+        arguments = ["--output", monitor.name]
+        if not monitor.enabled:
+            arguments.append("--off")
+            return arguments
+
+        if Property.enabled in properties:
+            arguments.append("--on")
+
+        mode = monitor.active_mode
+        if Property.mode in properties and mode is not None:
+            arguments.extend(["--mode", f"{mode.width}x{mode.height}@{mode.refresh}"])
+
+        if Property.position in properties:
+            arguments.extend(["--pos", f"{monitor.position.x},{monitor.position.y}"])
+
+        if Property.transform in properties:
+            arguments.extend(["--transform", str(monitor.transform)])
+
+        if Property.scale in properties:
+            arguments.extend(["--scale", str(monitor.scale)])
+
+        return arguments
+
+    @staticmethod
+    def _run(arguments: list[str], dry_run: bool = False) -> str:
+        """
+        Returns why the wlr-randr run failed, empty string on success.
+        """
+        command = ["wlr-randr", *arguments]
+        if dry_run:
+            command.append("--dryrun")
+
+        try:
+            result = run_command(command)
+        except CommandError as e:
+            return str(e)
+
+        if result.ok:
+            return ""
+
+        return result.error_message()
+
+    def _find_failures(
+        self,
+        outputs: list[tuple[Monitor, Collection[Property]]],
+        error: str,
+    ) -> dict[str, str]:
+        # wlr-randr applies everything in one transaction and doesn't say which output
+        # broke it, test the outputs one by one to find out
+        failures = {}
+        for monitor, properties in outputs:
+            output_error = self._run(self._output_arguments(monitor, properties), dry_run=True)
+            if output_error:
+                failures[monitor.name] = output_error
+
+        if failures:
+            return failures
+
+        return {monitor.name: error for monitor, _ in outputs}
+
+    def _save(self, outputs: list[tuple[Monitor, Collection[Property]]]) -> None:
+        # one invocation -> one output configuration -> one modeset
+        arguments = []
+        for monitor, properties in outputs:
+            arguments.extend(self._output_arguments(monitor, properties))
+
+        if not arguments:
+            return
+
+        error = self._run(arguments)
+        output_state.invalidate()
+        if error:
+            raise ConfigurationError(
+                "Failed to apply configuration",
+                self._find_failures(outputs, error),
+            )
+
     def save_configuration(self, monitors: list[Monitor]) -> None:
-        for monitor in monitors:
-            command = ["wlr-randr"]
-            command.append(f"--output {monitor.name}")
-
-            if monitor.enabled:
-                command.append("--on")
-            else:
-                command.append("--off")
-
-            mode = monitor.active_mode
-            command.append(f"--mode {mode.width}x{mode.height}@{mode.refresh}")
-            command.append("--prefered")
-            command.append(f"--pos {monitor.position.x},{monitor.position.y}")
-            command.append(f"--transform {monitor.transform}")
-            command.append(f"--scale {monitor.scale}")
-
-            run(command)
+        self._save([(monitor, frozenset(Property)) for monitor in monitors])
+
+    def save_diff(self, diff: ConfigDiff) -> None:
+        self._save([(output.monitor, output.changed) for output in diff.outputs.values()])
@@ -0,0 +1,79 @@
+"""
+this takes screenshots of outputs with grim, streamed through a pipe into memory
+"""
+
+import shutil
+from enum import StrEnum
+from typing import Optional
+
+from wayrandr.command import CommandError, run_command
+from wayrandr.constants import CAPTURE_FORMAT, CAPTURE_JPEG_QUALITY, CAPTURE_TIMEOUT_S
+
+
+class CaptureFormat(StrEnum):
+    # raw pixels, biggest pipe transfer but cheapest to produce and load
+    ppm = "ppm"
+    # smallest transfer, lossy, quality set by CAPTURE_JPEG_QUALITY
+    jpeg = "jpeg"
+    png = "png"
+
+
+DEFAULT_CAPTURE_FORMAT = CaptureFormat(CAPTURE_FORMAT)
+
+
+def is_available() -> bool:
+    return shutil.which("grim") is not None
+
+
+def grim_command(
+    output_name: str,
+    geometry: str,
+    image_format: CaptureFormat = DEFAULT_CAPTURE_FORMAT,
+    scale: Optional[float] = None,
+) -> list[str]:
+    command = ["grim", "-o", output_name, "-g", geometry, "-t", str(image_format)]
+    if image_format == CaptureFormat.jpeg:
+        command.extend(["-q", str(CAPTURE_JPEG_QUALITY)])
+
+    # grim downscales while compositing, so the full size image never exists
+    if scale is not None:
+        command.extend(["-s", f"{scale:.4f}"])
+
+    # - means write the image to stdout
+    command.append("-")
+    return command
+
+
+def capture(
+    output_name: str,
+    geometry: str,
+    image_format: CaptureFormat = DEFAULT_CAPTURE_FORMAT,
+    scale: Optional[float] = None,
+) -> Optional[bytes]:
+    """
+    Returns encoded image of the output or None if grim failed or timed out.
+
+    `scale` is the factor of the output image size to the captured geometry.
+    """
+    command = grim_command(output_name, geometry, image_format, scale)
+    try:
+        result = run_command(command, timeout=CAPTURE_TIMEOUT_S, text=False)
+    except CommandError:
+        return None
+
+    if not result.ok or not result.stdout:
+        return None
+
+    return result.stdout
+
+
+def thumbnail_scale(size: tuple[int, int], target_size: tuple[int, int]) -> float:
+    """
+    Scale factor for capturing an output of `size` so that it fits into `target_size`.
+
+    Works for rotated targets too, never upscales.
+    """
+    if max(size) <= 0:
+        return 1.0
+
+    return min(1.0, max(target_size) / max(size))
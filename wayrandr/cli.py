@@ -0,0 +1,377 @@
+"""
+command line interface, it must not import Qt
+
+without a subcommand the GUI is started, everything else works headless
+"""
+
+import argparse
+import json
+import sys
+from copy import deepcopy
+from pathlib import Path
+from typing import Optional
+
+from wayrandr.backend.base import ConfigurationError, RandrBackend
+from wayrandr.backend.kanshi import DEFAULT_PROFILE_NAME, KanshiBackend
+from wayrandr.backend.wlr_output_management import WlrOutputManagementBackend
+from wayrandr.backend.wlr_randr import WlrRandrBackend
+from wayrandr.command import CommandError, command_stats
+from wayrandr.diff import ConfigDiff, Property
+from wayrandr.kanshi import (
+    KanshiParseError,
+    ProfileIndex,
+    apply_profile,
+    default_config_path,
+    load,
+)
+from wayrandr.monitor import (
+    Mode,
+    Monitor,
+    MonitorDecodeError,
+    get_monitors,
+    monitor_to_json,
+    parse_monitors,
+)
+from wayrandr.presets import Preset, PresetError, PresetStore
+
+BACKENDS = {
+    "wlr-randr": WlrRandrBackend,
+    "wayland": WlrOutputManagementBackend,
+}
+
+
+def _describe(monitor: Monitor, changed: set[Property]) -> str:
+    if Property.enabled in changed and not monitor.enabled:
+        return "off"
+
+    values = {
+        Property.enabled: "on",
+        Property.mode: str(monitor.active_mode or "no modes"),
+        Property.position: f"position {monitor.position.x},{monitor.position.y}",
+        Property.transform: f"transform {monitor.transform}",
+        Property.scale: f"scale {monitor.scale}",
+    }
+    return ", ".join(value for prop, value in values.items() if prop in changed)
+
+
+def _requested_mode(monitor: Monitor, target: Monitor) -> Optional[Mode]:
+    requested = next((mode for mode in target.modes if mode.current), None)
+    if requested is None:
+        return None
+
+    mode = monitor.mode_table.get(requested.width, requested.height, requested.refresh)
+    if mode is None:
+        raise ValueError(f"{monitor.name} doesn't support mode {requested}")
+
+    return mode
+
+
+def _read_json(path: str, current: list[Monitor]) -> list[Monitor]:
+    """
+    Copies of the current monitors with what the file sets, fields it leaves out are kept.
+
+    Raises OSError and ValueError (incl. MonitorDecodeError).
+    """
+    text = sys.stdin.read() if path == "-" else Path(path).read_text()
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise MonitorDecodeError(f"Invalid JSON: {e}") from e
+
+    # parse_monitors checks the structure, the raw objects tell which fields are set
+    wanted = {
+        monitor.name: (monitor, {key for key, value in raw.items() if value is not None})
+        for monitor, raw in zip(parse_monitors(data), data, strict=True)
+    }
+    result = deepcopy(current)
+    for monitor in result:
+        if monitor.name not in wanted:
+            continue
+
+        target, fields = wanted[monitor.name]
+        if "enabled" in fields:
+            monitor.enabled = target.enabled
+
+        if "position" in fields:
+            monitor.position = target.position
+
+        if "scale" in fields:
+            monitor.scale = target.scale
+
+        if "transform" in fields:
+            monitor.transform = target.transform
+
+        mode = _requested_mode(monitor, target)
+        if mode is not None:
+            monitor.active_mode = mode
+
+    return result
+
+
+def _target_diff(args: argparse.Namespace) -> ConfigDiff:
+    """
+    Raises OSError, ValueError (incl. MonitorDecodeError) and KanshiParseError.
+    """
+    current = get_monitors()
+    if args.target == "-" or args.target.endswith(".json"):
+        return ConfigDiff.between(current, _read_json(args.target, current))
+
+    for config in load(args.config):
+        profile = config.get_profile(args.target)
+        if profile is not None:
+            return ConfigDiff.between(current, apply_profile(profile, current))
+
+    raise ValueError(f"No kanshi profile named {args.target}")
+
+
+def list_command(args: argparse.Namespace) -> int:
+    monitors = get_monitors()
+    if args.json:
+        print(json.dumps([monitor_to_json(monitor) for monitor in monitors], indent=2))
+        return 0
+
+    for monitor in monitors:
+        print(f'{monitor.name} "{monitor.description}"')
+        if not monitor.enabled:
+            print("  off")
+            continue
+
+        print(f"  {monitor.active_mode or 'no modes'}")
+        print(f"  position {monitor.position.x},{monitor.position.y}")
+        print(f"  transform {monitor.transform}")
+        print(f"  scale {monitor.scale}")
+
+    return 0
+
+
+def diff_command(args: argparse.Namespace) -> int:
+    try:
+        diff = _target_diff(args)
+    except (OSError, ValueError, KanshiParseError) as e:
+        print(f"Can't read the configuration: {e}", file=sys.stderr)
+        return 1
+
+    for name, output in diff.outputs.items():
+        print(f"{name}: {_describe(output.monitor, output.changed)}")
+
+    return 0
+
+
+def apply_command(args: argparse.Namespace) -> int:
+    try:
+        diff = _target_diff(args)
+    except (OSError, ValueError, KanshiParseError) as e:
+        print(f"Can't read the configuration: {e}", file=sys.stderr)
+        return 1
+
+    backend: RandrBackend = BACKENDS[args.backend]()
+    try:
+        backend.save_diff(diff)
+    except ConfigurationError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def save_command(args: argparse.Namespace) -> int:
+    try:
+        KanshiBackend(args.profile, args.config).save_configuration(get_monitors())
+    except (OSError, KanshiParseError) as e:
+        print(f"Can't save kanshi profile: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def _load_presets(path: Optional[str]) -> Optional[PresetStore]:
+    try:
+        return PresetStore.load(path)
+    except PresetError as e:
+        print(e, file=sys.stderr)
+        return None
+
+
+def preset_list_command(args: argparse.Namespace) -> int:
+    store = _load_presets(args.presets)
+    if store is None:
+        return 1
+
+    matching = {preset.name for preset in store.for_monitors(get_monitors())}
+    for preset in store.presets:
+        marker = "*" if preset.name in matching else " "
+        outputs = ", ".join(monitor.name for monitor in preset.monitors)
+        print(f"{marker} {preset.name} ({outputs})")
+
+    return 0
+
+
+def preset_save_command(args: argparse.Namespace) -> int:
+    store = _load_presets(args.presets)
+    if store is None:
+        return 1
+
+    store.put(Preset.from_monitors(args.name, get_monitors()))
+    try:
+        store.save()
+    except OSError as e:
+        print(f"Can't save presets: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def preset_remove_command(args: argparse.Namespace) -> int:
+    store = _load_presets(args.presets)
+    if store is None:
+        return 1
+
+    if store.remove(args.name) is None:
+        print(f"No preset named {args.name}", file=sys.stderr)
+        return 1
+
+    try:
+        store.save()
+    except OSError as e:
+        print(f"Can't save presets: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def preset_apply_command(args: argparse.Namespace) -> int:
+    store = _load_presets(args.presets)
+    if store is None:
+        return 1
+
+    current = get_monitors()
+    preset = store.match(current) if args.name is None else store.get(args.name)
+    if preset is None:
+        print("No such preset for the connected outputs", file=sys.stderr)
+        return 1
+
+    # one diff -> one backend call -> one transaction
+    diff = ConfigDiff.between(current, preset.apply_to(current))
+    try:
+        BACKENDS[args.backend]().save_diff(diff)
+    except ConfigurationError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def profile_command(args: argparse.Namespace) -> int:
+    try:
+        index = ProfileIndex.from_configs(load(args.config))
+    except (OSError, KanshiParseError) as e:
+        print(f"Can't read kanshi config: {e}", file=sys.stderr)
+        return 1
+
+    profile = index.match(get_monitors())
+    if profile is None:
+        print("No kanshi profile matches the connected outputs", file=sys.stderr)
+        return 1
+
+    print(profile.name or "<unnamed profile>")
+    return 0
+
+
+def gui_command(_args: argparse.Namespace) -> int:
+    # Qt is imported only here
+    from wayrandr.main import run
+
+    run()
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    result = argparse.ArgumentParser(prog="wayrandr")
+    result.set_defaults(func=gui_command)
+    result.add_argument(
+        "--timings",
+        action="store_true",
+        help="print how long the external tools took to stderr",
+    )
+    subparsers = result.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="print the connected outputs")
+    list_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="print the outputs as JSON accepted by apply and diff",
+    )
+    list_parser.set_defaults(func=list_command)
+
+    target_help = "kanshi profile name, or JSON file with outputs (- for stdin)"
+    apply = subparsers.add_parser("apply", help="apply kanshi profile or JSON configuration")
+    apply.add_argument("target", help=target_help)
+    apply.add_argument("--config", default=default_config_path(), help="kanshi config")
+    apply.add_argument("--backend", choices=BACKENDS, default="wlr-randr")
+    apply.set_defaults(func=apply_command)
+
+    diff = subparsers.add_parser("diff", help="print what apply would change")
+    diff.add_argument("target", help=target_help)
+    diff.add_argument("--config", default=default_config_path(), help="kanshi config")
+    diff.set_defaults(func=diff_command)
+
+    save = subparsers.add_parser("save", help="save the current outputs as kanshi profile")
+    save.add_argument("--profile", default=DEFAULT_PROFILE_NAME, help="profile name")
+    save.add_argument("--config", default=default_config_path(), help="kanshi config")
+    save.set_defaults(func=save_command)
+
+    preset = subparsers.add_parser("preset", help="manage saved layouts")
+    preset.add_argument("--presets", help="presets file")
+    preset_commands = preset.add_subparsers(dest="preset_command", required=True)
+    preset_list = preset_commands.add_parser(
+        "list",
+        help="print the presets, * marks the ones for the connected outputs",
+    )
+    preset_list.set_defaults(func=preset_list_command)
+    preset_save = preset_commands.add_parser("save", help="save the current layout")
+    preset_save.add_argument("name")
+    preset_save.set_defaults(func=preset_save_command)
+    preset_remove = preset_commands.add_parser("remove", help="remove the preset")
+    preset_remove.add_argument("name")
+    preset_remove.set_defaults(func=preset_remove_command)
+    preset_apply = preset_commands.add_parser(
+        "apply",
+        help="apply the preset, the one for the connected outputs if no name is given",
+    )
+    preset_apply.add_argument("name", nargs="?")
+    preset_apply.add_argument("--backend", choices=BACKENDS, default="wlr-randr")
+    preset_apply.set_defaults(func=preset_apply_command)
+
+    profile = subparsers.add_parser(
+        "profile",
+        help="print the kanshi profile matching the connected outputs",
+    )
+    profile.add_argument("--config", default=default_config_path(), help="kanshi config")
+    profile.set_defaults(func=profile_command)
+
+    return result
+
+
+def print_timings() -> None:
+    for program, stats in command_stats().items():
+        print(
+            f"{program}: {stats.calls} calls, {stats.failures} failed, "
+            f"mean {stats.mean_ms:.1f} ms, max {stats.max_ms:.1f} ms",
+            file=sys.stderr,
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (CommandError, MonitorDecodeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if args.timings:
+            print_timings()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+every external tool (wlr-randr, grim) is run through here, so each call has a timeout,
+can be cancelled and its latency is recorded
+
+this blocks the calling thread, the GUI calls it from QThreadPool only
+"""
+
+import os
+import signal
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from subprocess import PIPE, Popen, TimeoutExpired
+from typing import Optional, Union
+
+from wayrandr.constants import COMMAND_TIMEOUT_S
+
+
+class CommandError(OSError):
+    """
+    The command couldn't be started or didn't succeed.
+
+    Subclass of OSError, so code handling a missing binary handles this too.
+    """
+
+    def __init__(self, message: str, result: Optional["CommandResult"] = None) -> None:
+        super().__init__(message)
+        self.result = result
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+@dataclass
+class CommandResult:
+    argv: list[str]
+    returncode: int
+    stdout: Union[str, bytes]
+    stderr: Union[str, bytes]
+    duration_ms: float
+    timed_out: bool = False
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    def error_message(self) -> str:
+        program = self.argv[0]
+        if self.timed_out:
+            return f"{program} timed out after {self.duration_ms / 1000:.1f} s"
+
+        if self.cancelled:
+            return f"{program} was cancelled"
+
+        stderr = (
+            self.stderr.decode(errors="replace") if isinstance(self.stderr, bytes) else self.stderr
+        )
+        return stderr.strip() or f"{program} exited with {self.returncode}"
+
+    def check(self) -> "CommandResult":
+        if not self.ok:
+            raise CommandError(self.error_message(), self)
+
+        return self
+
+
+@dataclass
+class CommandStats:
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+_stats: dict[str, CommandStats] = {}
+_stats_lock = threading.Lock()
+_running: set["Command"] = set()
+_running_lock = threading.Lock()
+
+
+def _record(result: CommandResult) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(os.path.basename(result.argv[0]), CommandStats())
+        stats.calls += 1
+        stats.failures += not result.ok
+        stats.timeouts += result.timed_out
+        stats.total_ms += result.duration_ms
+        stats.max_ms = max(stats.max_ms, result.duration_ms)
+
+
+def command_stats() -> dict[str, CommandStats]:
+    """
+    Latency of the commands run so far, by program name.
+    """
+    with _stats_lock:
+        return {program: replace(stats) for program, stats in _stats.items()}
+
+
+class Command:
+    def __init__(
+        self,
+        argv: Sequence[str],
+        timeout: Optional[float] = COMMAND_TIMEOUT_S,
+        text: bool = True,
+    ) -> None:
+        self.argv = list(argv)
+        self.timeout = timeout
+        self.text = text
+        self._process: Optional[Popen] = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self) -> CommandResult:
+        """
+        Run the command and wait for it, at most `timeout` seconds.
+
+        Failing commands are returned too, raises CommandError only if the command
+        couldn't be started at all.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self._cancelled:
+                raise CommandError(f"{self.argv[0]} was cancelled")
+
+            try:
+                # own process group, so killing it takes down what it started as well
+                self._process = Popen(
+                    self.argv,
+                    stdout=PIPE,
+                    stderr=PIPE,
+                    text=self.text,
+                    start_new_session=True,
+                )
+            except OSError as e:
+                raise CommandError(f"Can't run {self.argv[0]}: {e}") from e
+
+        with _running_lock:
+            _running.add(self)
+
+        timed_out = False
+        try:
+            stdout, stderr = self._process.communicate(timeout=self.timeout)
+        except TimeoutExpired:
+            timed_out = True
+            self._kill()
+            stdout, stderr = self._process.communicate()
+        finally:
+            with _running_lock:
+                _running.discard(self)
+
+        result = CommandResult(
+            argv=self.argv,
+            returncode=self._process.returncode,
+            stdout=stdout,
+            stderr=stderr,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            timed_out=timed_out,
+            cancelled=self._cancelled,
+        )
+        _record(result)
+        return result
+
+    def cancel(self) -> None:
+        """
+        Kill the command, run() then returns a cancelled result. Safe from any thread.
+        """
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None and self._process.poll() is None:
+                self._kill()
+
+    def _kill(self) -> None:
+        # children left behind would keep the pipes open and communicate() waiting
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def run_command(
+    argv: Sequence[str],
+    timeout: Optional[float] = COMMAND_TIMEOUT_S,
+    text: bool = True,
+) -> CommandResult:
+    return Command(argv, timeout, text).run()
+
+
+def cancel_all() -> None:
+    """
+    Kill every command that is running right now, e.g. when the application quits.
+    """
+    with _running_lock:
+        commands = list(_running)
+
+    for command in commands:
+        command.cancel()
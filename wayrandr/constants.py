@@ -1,2 +1,23 @@
 SNAP_DISTANCE = 10
 GRID_SCALING = 10
+# ppm is raw pixels, no encoding in grim and no decoding on our side
+CAPTURE_FORMAT = "ppm"
+# used only for jpeg captures
+CAPTURE_JPEG_QUALITY = 50
+# how often is one of the monitor previews refreshed, 0 turns live preview off
+LIVE_PREVIEW_INTERVAL_MS = 1000
+# when a capture takes longer than this, previews are refreshed less often
+LIVE_PREVIEW_BUDGET_MS = 150
+LIVE_PREVIEW_MAX_INTERVAL_MS = 16000
+# info tab positions follow a dragged monitor at most once per this interval (~60 fps)
+INFO_UPDATE_INTERVAL_MS = 16
+# how often is the compositor asked for connected outputs (hot-plug)
+OUTPUT_POLL_INTERVAL_MS = 2000
+# set to print durations of startup phases, "exit" quits after startup (benchmarks)
+STARTUP_TIMES_ENV = "WAYRANDR_STARTUP_TIMES"
+# external tools that don't finish in time are killed, a hung compositor can't hang us
+COMMAND_TIMEOUT_S = 5.0
+# a preview that takes longer than this is useless anyway
+CAPTURE_TIMEOUT_S = 2.0
+# outputs read from wlr-randr are reused for this long, applying a configuration resets it
+OUTPUT_STATE_TTL_S = 1.0
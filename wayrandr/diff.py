@@ -0,0 +1,74 @@
+"""
+difference between the configuration read from compositor and the edited one
+"""
+
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+from wayrandr.monitor import Monitor
+
+
+class Property(StrEnum):
+    enabled = "enabled"
+    mode = "mode"
+    position = "position"
+    transform = "transform"
+    scale = "scale"
+
+
+@dataclass
+class MonitorDiff:
+    monitor: Monitor
+    changed: set[Property] = field(default_factory=set)
+
+    @classmethod
+    def between(cls, initial: Monitor, edited: Monitor) -> "MonitorDiff":
+        changed = set()
+        if initial.enabled != edited.enabled:
+            changed.add(Property.enabled)
+
+        if initial.active_mode != edited.active_mode:
+            changed.add(Property.mode)
+
+        if initial.position != edited.position:
+            changed.add(Property.position)
+
+        if initial.transform != edited.transform:
+            changed.add(Property.transform)
+
+        if initial.scale != edited.scale:
+            changed.add(Property.scale)
+
+        # turning output on, send everything so it doesn't come up with some old state
+        if Property.enabled in changed and edited.enabled:
+            changed = set(Property)
+
+        return cls(monitor=edited, changed=changed)
+
+
+@dataclass
+class ConfigDiff:
+    outputs: dict[str, MonitorDiff] = field(default_factory=dict)
+
+    @classmethod
+    def between(cls, initial: list[Monitor], edited: list[Monitor]) -> "ConfigDiff":
+        initial_by_name = {monitor.name: monitor for monitor in initial}
+        outputs = {}
+        for monitor in edited:
+            initial_monitor = initial_by_name.get(monitor.name)
+            if initial_monitor is None:
+                diff = MonitorDiff(monitor=monitor, changed=set(Property))
+            else:
+                diff = MonitorDiff.between(initial_monitor, monitor)
+
+            if diff.changed:
+                outputs[monitor.name] = diff
+
+        return cls(outputs=outputs)
+
+    def __bool__(self) -> bool:
+        return bool(self.outputs)
+
+    @property
+    def monitors(self) -> list[Monitor]:
+        return [diff.monitor for diff in self.outputs.values()]
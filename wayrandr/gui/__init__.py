@@ -1,3 +1,11 @@
-from wayrandr.gui.main_window import MainWindow
+# MainWindow pulls in all widgets and the generated UI, import it only when asked for
+def __getattr__(name: str) -> object:
+    if name == "MainWindow":
+        from wayrandr.gui.main_window import MainWindow
+
+        return MainWindow
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["MainWindow"]
@@ -0,0 +1,30 @@
+"""
+configuration is applied in QThreadPool, so a hung wlr-randr never blocks the GUI thread
+"""
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from wayrandr.backend.base import ConfigurationError, RandrBackend
+from wayrandr.diff import ConfigDiff
+
+
+class ConfigurationSignals(QObject):
+    # error message, empty if the configuration was applied
+    finished = Signal(str)
+
+
+class ConfigurationJob(QRunnable):
+    def __init__(self, backend: RandrBackend, diff: ConfigDiff) -> None:
+        super().__init__()
+        self.backend = backend
+        self.diff = diff
+        self.signals = ConfigurationSignals()
+
+    def run(self) -> None:
+        try:
+            self.backend.save_diff(self.diff)
+        except (ConfigurationError, OSError) as e:
+            self.signals.finished.emit(str(e))
+            return
+
+        self.signals.finished.emit("")
@@ -0,0 +1,86 @@
+from collections.abc import Callable
+from typing import Optional
+
+from PySide6.QtCore import QObject, QTimer
+
+from wayrandr.constants import (
+    LIVE_PREVIEW_BUDGET_MS,
+    LIVE_PREVIEW_INTERVAL_MS,
+    LIVE_PREVIEW_MAX_INTERVAL_MS,
+)
+from wayrandr.gui.monitor_widget import MonitorWidget
+
+
+class PreviewScheduler(QObject):
+    """
+    Refreshes monitor previews periodically, one monitor per tick.
+
+    A tick is dropped while the previous capture is still running or while paused
+    (e.g. during drag). If captures take longer than the budget, the interval doubles
+    until they fit again, then it goes back to the configured one.
+    """
+
+    def __init__(
+        self,
+        get_widgets: Callable[[], list[MonitorWidget]],
+        interval: int = LIVE_PREVIEW_INTERVAL_MS,
+        budget: int = LIVE_PREVIEW_BUDGET_MS,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self.get_widgets = get_widgets
+        self.interval = interval
+        self.budget = budget
+
+        self._next = 0
+        self._in_flight = False
+        self._paused = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def current_interval(self) -> int:
+        return self._timer.interval()
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def pause(self) -> None:
+        self._paused = True
+
+    def resume(self) -> None:
+        self._paused = False
+
+    def _tick(self) -> None:
+        if self._in_flight or self._paused:
+            return
+
+        widgets = [
+            widget
+            for widget in self.get_widgets()
+            if widget.isVisible() and widget.applied_monitor.enabled
+        ]
+        if not widgets:
+            return
+
+        widget = widgets[self._next % len(widgets)]
+        self._next += 1
+        self._in_flight = widget.update_screen(on_finished=self._capture_finished)
+        if not self._in_flight:
+            # nothing can capture screenshots, don't bother anymore
+            self.stop()
+
+    def _capture_finished(self, elapsed: float) -> None:
+        self._in_flight = False
+        if elapsed > self.budget:
+            interval = min(self.current_interval * 2, LIVE_PREVIEW_MAX_INTERVAL_MS)
+        else:
+            interval = max(self.current_interval // 2, self.interval)
+
+        self._timer.setInterval(interval)
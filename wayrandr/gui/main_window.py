@@ -1,13 +1,30 @@
-from PySide6.QtCore import QRect
-from PySide6.QtWidgets import QMainWindow
+import copy
+from dataclasses import dataclass
+from typing import Optional
+
+from PySide6.QtCore import QPoint, QThreadPool, QTimer
+from PySide6.QtWidgets import QInputDialog, QMainWindow, QMessageBox
 
 from wayrandr.backend.wlr_randr import WlrRandrBackend
-from wayrandr.constants import SNAP_DISTANCE
+from wayrandr.constants import INFO_UPDATE_INTERVAL_MS
+from wayrandr.diff import ConfigDiff
+from wayrandr.gui.configuration_job import ConfigurationJob
+from wayrandr.gui.live_preview import PreviewScheduler
 from wayrandr.gui.monitor_info_widget import MonitorInfoWidget
 from wayrandr.gui.monitor_widget import MonitorWidget
+from wayrandr.gui.output_watcher import OutputWatcher
 from wayrandr.gui.ui.generated_ui.main_window import Ui_main_window
-from wayrandr.helpers import deapply_scaling
-from wayrandr.monitor import Monitor, Transform, get_monitors
+from wayrandr.kanshi import KanshiParseError, ProfileIndex, default_config_path, load
+from wayrandr.layout import Layout
+from wayrandr.monitor import Monitor, MonitorSnapshot, Transform, compare_monitors
+from wayrandr.presets import Preset, PresetError, PresetStore, fingerprint
+from wayrandr.snapping import SnapIndex
+
+
+@dataclass
+class OutputWidgets:
+    monitor_widget: MonitorWidget
+    monitor_info_widget: MonitorInfoWidget
 
 
 class MainWindow(QMainWindow):
@@ -19,213 +36,357 @@ class MainWindow(QMainWindow):
 
         self.ui.save_button.clicked.connect(self.save_configuration)
 
-        self.monitor_info_widgets = self.set_tab_widget_for_monitor_details()
+        # starts empty, outputs are added by the first read of output_watcher
+        # so the window can be shown without waiting for wlr-randr
+        self.monitors = MonitorSnapshot([])
+        self.output_layout = Layout(self.monitors)
+        # what the compositor has applied right now, save sends only the difference
+        self.applied_monitors: list[Monitor] = []
+        # configuration being applied right now by save_configuration
+        self._saving_monitors: list[Monitor] = []
+        # why the last read of outputs failed, shown in the status bar
+        self._output_error: Optional[str] = None
+
+        # output name -> its canvas widget and info tab
+        self.outputs: dict[str, OutputWidgets] = {}
+
+        self.preview_scheduler = PreviewScheduler(lambda: self.monitor_widgets, parent=self)
+        self.preview_scheduler.start()
+
+        self._snap_index: Optional[SnapIndex] = None
+
+        self._pending_info_positions: set[str] = set()
+        self._info_update_timer = QTimer(self)
+        self._info_update_timer.setSingleShot(True)
+        self._info_update_timer.setInterval(INFO_UPDATE_INTERVAL_MS)
+        self._info_update_timer.timeout.connect(self._flush_info_positions)
+
+        self.profile_index: Optional[ProfileIndex] = None
+        QTimer.singleShot(0, self.load_profile_index)
+
+        # loaded before the first read of outputs, presets are applied automatically
+        # only when a different set of monitors gets connected later
+        self.preset_store: Optional[PresetStore] = self._load_preset_store()
+        self._fingerprint: Optional[str] = None
+        self._pending_preset: Optional[Preset] = None
+        self.setup_preset_menu()
+
+        self.output_watcher = OutputWatcher(parent=self)
+        self.output_watcher.monitors_read.connect(self.update_outputs)
+        self.output_watcher.read_failed.connect(self.show_output_error)
+        self.output_watcher.start()
+
+    @property
+    def monitor_widgets(self) -> list[MonitorWidget]:
+        return [output.monitor_widget for output in self.outputs.values()]
+
+    @property
+    def monitor_info_widgets(self) -> list[MonitorInfoWidget]:
+        return [output.monitor_info_widget for output in self.outputs.values()]
+
+    def add_output(self, monitor: Monitor) -> None:
+        self.remove_output(monitor.name)
+
+        monitor_info_widget = MonitorInfoWidget(monitor)
+        self.ui.monitor_tab_widget.addTab(monitor_info_widget, monitor.name)
+
+        monitor_widget = MonitorWidget(monitor, self.applied_monitor)
+        rect = self.output_layout.canvas_rect(monitor.name)
+        monitor_widget.move(rect.x, rect.y)
+        monitor_widget.setParent(self.ui.monitors_area_widget)
+        # children added after the parent is shown are hidden by default
+        monitor_widget.show()
+
+        self.outputs[monitor.name] = OutputWidgets(monitor_widget, monitor_info_widget)
+
+    def remove_output(self, name: str) -> None:
+        output = self.outputs.pop(name, None)
+        if output is None:
+            return
+
+        tab_index = self.ui.monitor_tab_widget.indexOf(output.monitor_info_widget)
+        self.ui.monitor_tab_widget.removeTab(tab_index)
+        output.monitor_info_widget.deleteLater()
+        output.monitor_widget.deleteLater()
+
+    def rename_output(self, old_name: str, new_name: str) -> None:
+        output = self.outputs.pop(old_name, None)
+        if output is None:
+            return
+
+        self.outputs[new_name] = output
+        tab_index = self.ui.monitor_tab_widget.indexOf(output.monitor_info_widget)
+        self.ui.monitor_tab_widget.setTabText(tab_index, new_name)
+        output.monitor_widget.ui.monitor_name_label.setText(new_name)
+        output.monitor_info_widget.ui.name_val_label.setText(new_name)
+
+    def applied_monitor(self, name: str) -> Optional[Monitor]:
+        return next((monitor for monitor in self.applied_monitors if monitor.name == name), None)
+
+    def load_profile_index(self) -> None:
+        config_path = default_config_path()
+        if not config_path.exists():
+            return
+
+        try:
+            self.profile_index = ProfileIndex.from_configs(load(config_path))
+        except (OSError, KanshiParseError):
+            return
+
+        self.update_profile_status()
+
+    def update_profile_status(self) -> None:
+        # nothing to match before the outputs are read
+        if self.profile_index is None or not self.applied_monitors:
+            return
+
+        profile = self.profile_index.match(self.applied_monitors)
+        if profile is None:
+            message = "No kanshi profile matches the connected outputs"
+        else:
+            message = f"Matching kanshi profile: {profile.name or 'unnamed'}"
+
+        self.statusBar().showMessage(message)
+
+    def _load_preset_store(self) -> Optional[PresetStore]:
+        try:
+            return PresetStore.load()
+        except PresetError as e:
+            # don't overwrite a file we couldn't read, presets stay off
+            self.statusBar().showMessage(str(e))
+            return None
+
+    def setup_preset_menu(self) -> None:
+        menu = self.menuBar().addMenu("Presets")
+        menu.setEnabled(self.preset_store is not None)
+        menu.addAction("Save layout as preset...", self.save_preset)
+        self._apply_preset_menu = menu.addMenu("Apply")
+        self._apply_preset_menu.aboutToShow.connect(self._fill_apply_preset_menu)
+
+    def _fill_apply_preset_menu(self) -> None:
+        self._apply_preset_menu.clear()
+        presets = self.preset_store.for_monitors(self.applied_monitors)
+        for preset in presets:
+            self._apply_preset_menu.addAction(
+                preset.name,
+                # triggered passes the checked state first
+                lambda _checked=False, preset=preset: self.apply_preset(preset),
+            )
+
+        if not presets:
+            self._apply_preset_menu.addAction("No presets for these outputs").setEnabled(False)
+
+    def save_preset(self) -> None:
+        name, accepted = QInputDialog.getText(self, "Save preset", "Preset name:")
+        if not accepted or not name:
+            return
+
+        self.preset_store.put(Preset.from_monitors(name, self.monitors.monitors))
+        try:
+            self.preset_store.save()
+        except OSError as e:
+            QMessageBox.warning(self, "Preset not saved", str(e))
+
+    def apply_preset(self, preset: Preset) -> None:
+        # a save is in flight, apply the preset on top of its result
+        if not self.ui.save_button.isEnabled():
+            self._pending_preset = preset
+            return
+
+        # show the preset in the window first, then apply it like any other edit
+        monitors = preset.apply_to(self.applied_monitors)
+        for monitor in ConfigDiff.between(self.applied_monitors, monitors).monitors:
+            monitor = copy.deepcopy(monitor)
+            self.monitors.add(monitor)
+            self.add_output(monitor)
+
+        # only what the preset changes, unsaved edits of the other outputs stay unsaved
+        self._start_applying(monitors)
+
+    def _apply_matching_preset(self) -> None:
+        # only when a different set of monitors got connected, not after every change
+        current = fingerprint(self.applied_monitors)
+        if current == self._fingerprint:
+            return
+
+        previous, self._fingerprint = self._fingerprint, current
+        # opening the window must not reconfigure the outputs
+        if previous is None or self.preset_store is None:
+            return
+
+        preset = self.preset_store.match(self.applied_monitors)
+        if preset is not None:
+            self.statusBar().showMessage(f"Applying preset {preset.name}")
+            self.apply_preset(preset)
+
+    def update_outputs(self, monitors: list[Monitor]) -> None:
+        """
+        Sync the window with the outputs reported by the compositor, e.g. after hot-plug.
+
+        Compared with what was applied, so our own save doesn't count as a change.
+        Only affected outputs are touched, unsaved edits of the others are kept.
+        """
+        if self._output_error is not None:
+            self._output_error = None
+            self.statusBar().clearMessage()
+
+        changes = compare_monitors(self.applied_monitors, monitors)
+        if not changes:
+            return
+
+        # new widgets capture their preview from the applied state right away
+        self.applied_monitors = copy.deepcopy(monitors)
 
-        self.monitor_widgets = self.set_monitor_widgets()
+        for old_name, new_name in changes.renamed.items():
+            self.monitors.rename(old_name, new_name)
+            self.rename_output(old_name, new_name)
 
-    def set_tab_widget_for_monitor_details(self) -> list[MonitorInfoWidget]:
-        monitor_info_widgets = []
-        for monitor in get_monitors():
-            monitor_info_widget = MonitorInfoWidget(monitor)
-            self.ui.monitor_tab_widget.addTab(monitor_info_widget, monitor.name)
-            monitor_info_widgets.append(monitor_info_widget)
+        for name in changes.removed:
+            self.monitors.remove(name)
+            self.remove_output(name)
 
-        return monitor_info_widgets
+        for monitor in changes.added + changes.changed:
+            self.monitors.add(monitor)
+            self.add_output(monitor)
 
-    def set_monitor_widgets(self) -> list[MonitorWidget]:
-        monitor_widgets = []
-        for monitor in get_monitors():
-            monitor_widget = MonitorWidget(monitor)
-            monitor_widget.move(*monitor.position.scaled_position())
-            monitor_widget.setParent(self.ui.monitors_area_widget)
-            monitor_widgets.append(monitor_widget)
+        self.update_profile_status()
+        self._apply_matching_preset()
 
-        return monitor_widgets
+    def show_output_error(self, error: str) -> None:
+        # polling keeps failing the same way, show it once
+        if error == self._output_error:
+            return
+
+        self._output_error = error
+        self.statusBar().showMessage(f"Can't read outputs: {error}")
 
     def save_configuration(self) -> None:
-        WlrRandrBackend().save_configuration([monitor.monitor for monitor in self.monitor_widgets])
+        self.output_layout.normalize()
+        for monitor in self.monitors:
+            self.update_monitor_positions(monitor)
+            monitor_info = self.get_monitor_widget_by_name(monitor.name, is_monitor_info=True)
+            if monitor_info is not None:
+                monitor_info.set_position(monitor.position.x, monitor.position.y)
+
+        # the job works with a copy, the user can keep editing meanwhile
+        self._start_applying(copy.deepcopy(self.monitors.monitors))
+
+    def _start_applying(self, monitors: list[Monitor]) -> None:
+        self._saving_monitors = monitors
+        diff = ConfigDiff.between(self.applied_monitors, monitors)
+        job = ConfigurationJob(WlrRandrBackend(), diff)
+        job.signals.finished.connect(self._configuration_saved)
+        self.ui.save_button.setEnabled(False)
+        QThreadPool.globalInstance().start(job)
+
+    def _configuration_saved(self, error: str) -> None:
+        self.ui.save_button.setEnabled(True)
+        if error:
+            QMessageBox.warning(self, "Configuration not applied", error)
+        else:
+            saved = ConfigDiff.between(self.applied_monitors, self._saving_monitors)
+            self.applied_monitors = self._saving_monitors
+            # previews of the saved outputs show the old configuration, capture them again
+            for name in saved.outputs:
+                self.update_monitor_mirror(name)
+                monitor_widget = self.get_monitor_widget_by_name(name)
+                if monitor_widget is not None:
+                    monitor_widget.update_screen()
+
+        preset, self._pending_preset = self._pending_preset, None
+        # the outputs may have changed again while waiting
+        if preset is not None and preset.fingerprint == fingerprint(self.applied_monitors):
+            self.apply_preset(preset)
 
     def get_monitor_widget_by_name(
         self,
         name: str,
         is_monitor_info: bool = False,
-    ) -> MonitorWidget | MonitorInfoWidget:
-        widgets = self.monitor_widgets
-        if is_monitor_info:
-            widgets = self.monitor_info_widgets
+    ) -> Optional[MonitorWidget | MonitorInfoWidget]:
+        """
+        Returns None for outputs that are gone (e.g. unplugged meanwhile).
+        """
+        output = self.outputs.get(name)
+        if output is None:
+            return None
 
-        for widget in widgets:
-            if widget.monitor.name == name:
-                return widget
+        if is_monitor_info:
+            return output.monitor_info_widget
 
-        raise ValueError(f"Monitor with name {name} not found")
+        return output.monitor_widget
 
     def update_monitor_positions(self, monitor: Monitor) -> None:
         monitor_widget = self.get_monitor_widget_by_name(monitor.name)
-        monitor_widget.move(*monitor.position.scaled_position())
+        if monitor_widget is None:
+            return
+
+        rect = self.output_layout.canvas_rect(monitor.name)
+        monitor_widget.move(rect.x, rect.y)
+
+    def update_monitor_geometry(self, monitor: Monitor) -> None:
+        monitor_widget = self.get_monitor_widget_by_name(monitor.name)
+        if monitor_widget is None:
+            return
+
+        rect = self.output_layout.canvas_rect(monitor.name)
+        monitor_widget.setFixedSize(rect.width, rect.height)
+        monitor_widget.move(rect.x, rect.y)
 
     def update_monitor_info_positions(self, monitor_widget: MonitorWidget) -> None:
-        monitor_info = self.get_monitor_widget_by_name(
-            monitor_widget.monitor.name,
-            is_monitor_info=True,
-        )
-        # wtf, when set here it laggs?!
-        monitor_info.set_position(
-            int(deapply_scaling(monitor_widget.x())),
-            int(deapply_scaling(monitor_widget.y())),
-        )
+        # called on every mouse move, spinboxes are updated once per frame at most
+        self._pending_info_positions.add(monitor_widget.monitor.name)
+        if not self._info_update_timer.isActive():
+            self._info_update_timer.start()
+
+    def _flush_info_positions(self) -> None:
+        for name in self._pending_info_positions:
+            monitor_info = self.get_monitor_widget_by_name(name, is_monitor_info=True)
+            if monitor_info is not None:
+                position = monitor_info.monitor.position
+                monitor_info.set_position(position.x, position.y)
+
+        self._pending_info_positions.clear()
 
     def update_monitor_resolution(self, monitor: Monitor) -> None:
-        monitor_widget = self.get_monitor_widget_by_name(monitor.name)
-        monitor_widget.setFixedSize(*monitor.active_mode.scaled_resolution())
+        self.update_monitor_geometry(monitor)
 
     def change_monitor_info_tab(self, monitor_name: str) -> None:
         monitor_info = self.get_monitor_widget_by_name(monitor_name, is_monitor_info=True)
-        self.ui.monitor_tab_widget.setCurrentWidget(monitor_info)
+        if monitor_info is not None:
+            self.ui.monitor_tab_widget.setCurrentWidget(monitor_info)
 
     def update_monitor_scale(self, monitor: Monitor) -> None:
-        monitor_widget = self.get_monitor_widget_by_name(monitor.name)
-        monitor_widget.setFixedSize(*monitor.active_mode.scaled_resolution(monitor.scale))
-
-    def _handle_rotation(
-        self,
-        monitor_widget: MonitorWidget,
-        curr_transform: Transform,
-        prev_transform: Transform,
-    ) -> None:
-        if monitor_widget.screenshot is None:
-            return
-
-        rotation_map = {
-            Transform.normal: 0,
-            Transform.normal_90: 90,
-            Transform.normal_180: 180,
-            Transform.normal_270: 270,
-            Transform.flipped: 0,
-            Transform.flipped_90: -90,
-            Transform.flipped_180: 180,
-            Transform.flipped_270: -270,
-        }
-        rotate = rotation_map[curr_transform] - rotation_map[prev_transform]
-        monitor_widget.rotate_screenshot(rotate)
+        self.update_monitor_geometry(monitor)
 
     def update_monitor_transform(self, monitor: Monitor, prev_transform: Transform) -> None:
-        monitor_widget = self.get_monitor_widget_by_name(monitor.name)
         if prev_transform == monitor.transform:
             return
 
-        if prev_transform.is_rotated != monitor.transform.is_rotated:
-            monitor_widget.setFixedSize(monitor_widget.height(), monitor_widget.width())
-
-        self._handle_rotation(monitor_widget, monitor.transform, prev_transform)
+        self.update_monitor_geometry(monitor)
+        self.update_monitor_mirror(monitor.name)
 
     def update_monitor_mirror(self, monitor_name: str) -> None:
         monitor_widget = self.get_monitor_widget_by_name(monitor_name)
-        monitor_widget.mirror_screenshot()
-
-    def snap_to_nearby_monitors(self, moving_monitor: MonitorWidget) -> None:
-        for monitor in self.monitor_widgets:
-            if monitor == moving_monitor:
-                continue
-
-            moving_monitor_rect = QRect(moving_monitor.pos(), moving_monitor.size())
-            target_monitor_rect = QRect(monitor.pos(), monitor.size())
-
-            # this did chatgpt, do not touch :D
-            self.snap_if_near_horizontally(
-                moving_monitor,
-                moving_monitor_rect,
-                target_monitor_rect,
-                monitor,
-            )
-            self.snap_if_near_vertically(
-                moving_monitor,
-                moving_monitor_rect,
-                target_monitor_rect,
-                monitor,
-            )
-            self.snap_if_near_diagonally(
-                moving_monitor,
-                moving_monitor_rect,
-                target_monitor_rect,
-                monitor,
-            )
-            self.snap_edges(moving_monitor, moving_monitor_rect, target_monitor_rect, monitor)
+        if monitor_widget is not None:
+            monitor_widget.invalidate_pixmap()
 
-    def snap_if_near_horizontally(
-        self,
-        moving_monitor,
-        moving_monitor_rect,
-        target_monitor_rect,
-        monitor,
-    ):
-        if abs(moving_monitor_rect.right() - target_monitor_rect.left()) < SNAP_DISTANCE:
-            moving_monitor.move(monitor.x() - moving_monitor.width(), moving_monitor.y())
-        elif abs(moving_monitor_rect.left() - target_monitor_rect.right()) < SNAP_DISTANCE:
-            moving_monitor.move(monitor.x() + monitor.width(), moving_monitor.y())
-
-    def snap_if_near_vertically(
-        self,
-        moving_monitor,
-        moving_monitor_rect,
-        target_monitor_rect,
-        monitor,
-    ):
-        if abs(moving_monitor_rect.bottom() - target_monitor_rect.top()) < SNAP_DISTANCE:
-            moving_monitor.move(moving_monitor.x(), monitor.y() - moving_monitor.height())
-        elif abs(moving_monitor_rect.top() - target_monitor_rect.bottom()) < SNAP_DISTANCE:
-            moving_monitor.move(moving_monitor.x(), monitor.y() + monitor.height())
-
-    def snap_if_near_diagonally(
-        self,
-        moving_monitor,
-        moving_monitor_rect,
-        target_monitor_rect,
-        monitor,
-    ):
-        if (
-            abs(moving_monitor_rect.top() - target_monitor_rect.bottom()) < SNAP_DISTANCE
-            and abs(moving_monitor_rect.right() - target_monitor_rect.left()) < SNAP_DISTANCE
-        ):
-            moving_monitor.move(
-                monitor.x() - moving_monitor.width(),
-                monitor.y() + monitor.height(),
-            )
-        elif (
-            abs(moving_monitor_rect.bottom() - target_monitor_rect.top()) < SNAP_DISTANCE
-            and abs(moving_monitor_rect.left() - target_monitor_rect.right()) < SNAP_DISTANCE
-        ):
-            moving_monitor.move(
-                monitor.x() + monitor.width(),
-                monitor.y() - moving_monitor.height(),
-            )
-        elif (
-            abs(moving_monitor_rect.top() - target_monitor_rect.bottom()) < SNAP_DISTANCE
-            and abs(moving_monitor_rect.left() - target_monitor_rect.right()) < SNAP_DISTANCE
-        ):
-            moving_monitor.move(monitor.x() + monitor.width(), monitor.y() + monitor.height())
-        elif (
-            abs(moving_monitor_rect.bottom() - target_monitor_rect.top()) < SNAP_DISTANCE
-            and abs(moving_monitor_rect.right() - target_monitor_rect.left()) < SNAP_DISTANCE
-        ):
-            moving_monitor.move(
-                monitor.x() - moving_monitor.width(),
-                monitor.y() - moving_monitor.height(),
-            )
+    def start_dragging(self, moving_monitor: MonitorWidget) -> None:
+        # the other monitors don't move during drag, index their edges only once
+        self._snap_index = self.output_layout.snap_index(moving_monitor.monitor.name)
+        # don't spend time on previews while the user is dragging
+        self.preview_scheduler.pause()
 
-    def snap_edges(self, moving_monitor, moving_monitor_rect, target_monitor_rect, monitor):
-        if abs(moving_monitor_rect.left() - target_monitor_rect.left()) < SNAP_DISTANCE:
-            moving_monitor.move(monitor.x(), moving_monitor.y())
-        elif abs(moving_monitor_rect.right() - target_monitor_rect.right()) < SNAP_DISTANCE:
-            moving_monitor.move(
-                monitor.x() + monitor.width() - moving_monitor.width(),
-                moving_monitor.y(),
-            )
+    def stop_dragging(self) -> None:
+        self._snap_index = None
+        self.preview_scheduler.resume()
 
-        if abs(moving_monitor_rect.top() - target_monitor_rect.top()) < SNAP_DISTANCE:
-            moving_monitor.move(moving_monitor.x(), monitor.y())
-        elif abs(moving_monitor_rect.bottom() - target_monitor_rect.bottom()) < SNAP_DISTANCE:
-            moving_monitor.move(
-                moving_monitor.x(),
-                monitor.y() + monitor.height() - moving_monitor.height(),
-            )
+    def snap_to_nearby_monitors(
+        self,
+        moving_monitor: MonitorWidget,
+        position: QPoint,
+    ) -> tuple[int, int]:
+        name = moving_monitor.monitor.name
+        x, y = self.output_layout.from_canvas(position.x(), position.y())
+        self.output_layout.snap(name, x, y, self._snap_index)
+        rect = self.output_layout.canvas_rect(name)
+        return rect.x, rect.y
@@ -1,3 +1,4 @@
+from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
     QWidget,
 )
@@ -62,13 +63,22 @@ class MonitorInfoWidget(QWidget):
         self.ui.position_y_spinbox.valueChanged.connect(self.change_position)
 
     def set_position(self, x: int, y: int) -> None:
-        self.ui.position_x_spinbox.setValue(x)
-        self.ui.position_y_spinbox.setValue(y)
+        # valueChanged would call change_position and move the monitor widget again
+        spinboxes = (self.ui.position_x_spinbox, self.ui.position_y_spinbox)
+        blocked = [spinbox.blockSignals(True) for spinbox in spinboxes]
+        try:
+            self.ui.position_x_spinbox.setValue(x)
+            self.ui.position_y_spinbox.setValue(y)
+        finally:
+            for spinbox, was_blocked in zip(spinboxes, blocked, strict=True):
+                spinbox.blockSignals(was_blocked)
+
         self.monitor.position.x = x
         self.monitor.position.y = y
 
     def change_position(self) -> None:
-        self.set_position(self.ui.position_x_spinbox.value(), self.ui.position_y_spinbox.value())
+        self.monitor.position.x = self.ui.position_x_spinbox.value()
+        self.monitor.position.y = self.ui.position_y_spinbox.value()
         self.window().update_monitor_positions(self.monitor)
 
     def setup_info_labels(self) -> None:
@@ -88,15 +98,33 @@ class MonitorInfoWidget(QWidget):
         self.ui.enabled_checkbox.setChecked(not self.monitor.enabled)
 
     def setup_resolution_combobox(self) -> None:
-        self.ui.resolution_combobox.addItems([str(mode) for mode in self.monitor.modes])
-        self.ui.resolution_combobox.setCurrentIndex(
-            self.ui.resolution_combobox.findText(str(self.monitor.active_mode)),
-        )
-        self.ui.resolution_combobox.activated.connect(self.change_resolution)
+        # grouped by resolution, each group starts with a header that can't be selected
+        combobox = self.ui.resolution_combobox
+        table = self.monitor.mode_table
+        for width, height in table.resolutions():
+            combobox.addItem(f"{width}x{height}")
+            header = combobox.model().item(combobox.count() - 1)
+            header.setFlags(Qt.ItemFlag.NoItemFlags)
+            font = header.font()
+            font.setBold(True)
+            header.setFont(font)
+
+            for mode in table.refresh_rates(width, height):
+                preferred = " (preferred)" if mode.preferred else ""
+                # position in monitor.modes, that is what change_resolution needs
+                combobox.addItem(f"    {mode}{preferred}", table.position(mode))
+
+        if self.monitor.active_mode is not None:
+            combobox.setCurrentIndex(combobox.findData(table.position(self.monitor.active_mode)))
+
+        combobox.activated.connect(self.change_resolution)
 
     def change_resolution(self, index: int) -> None:
-        new_mode = self.monitor.modes[index]
-        self.monitor.active_mode = new_mode
+        position = self.ui.resolution_combobox.itemData(index)
+        if position is None:
+            return
+
+        self.monitor.active_mode = self.monitor.modes[position]
         self.window().update_monitor_resolution(self.monitor)
 
     def change_scale(self, value: float) -> None:
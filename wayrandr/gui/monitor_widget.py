@@ -1,32 +1,54 @@
-import copy
-import shutil
-import tempfile
-from subprocess import run
+from collections.abc import Callable
+from functools import cache
+from typing import Optional
 
 from PySide6.QtCore import QPoint, Qt
-from PySide6.QtGui import QImage, QPainter, QPixmap, QTransform
+from PySide6.QtGui import QImage, QPainter, QPixmap, QResizeEvent, QTransform
 from PySide6.QtWidgets import QFrame
 
+from wayrandr.gui.screenshot import request_screenshot
 from wayrandr.gui.ui.generated_ui.monitor_widget import Ui_monitor_widget
-from wayrandr.monitor import Monitor
+from wayrandr.layout import canvas_size
+from wayrandr.monitor import Monitor, Transform
+
+
+@cache
+def transform_matrix(transform: Transform) -> QTransform:
+    # rotate first, then mirror, the same way the compositor does
+    matrix = QTransform().rotate(transform.rotation)
+    if transform.is_flipped:
+        matrix *= QTransform().scale(-1, 1)
+
+    return matrix
 
 
 class MonitorWidget(QFrame):
-    def __init__(self, monitor: Monitor) -> None:
+    def __init__(
+        self,
+        monitor: Monitor,
+        applied_monitor: Callable[[str], Optional[Monitor]],
+    ) -> None:
         super().__init__()
+        # edited by the user, not applied until the configuration is saved
         self.monitor = monitor
-        self.initial_monitor = copy.deepcopy(monitor)
+        # what the compositor shows right now, owned by the main window
+        self._applied_monitor = applied_monitor
 
         self.ui = Ui_monitor_widget()
         self.ui.setupUi(self)
 
-        self.setFixedSize(*self.monitor.active_mode.scaled_resolution())
+        self.setFixedSize(*canvas_size(self.monitor))
 
         self.ui.monitor_name_label.setText(self.monitor.name)
 
-        # TODO: getting img from xdg-desktop-portal every 1sec would be cool
-        # and it will get rid of that 1s delay at the start due to screenshoting
+        # screenshot is taken in background, the widget stays empty until it arrives,
+        # then it is refreshed by the PreviewScheduler of the main window
+        # it is kept as captured, i.e. in the transform that was applied in the compositor
         self.screenshot = None
+        self._captured_transform = Transform.normal
+        self._requested_transform = Transform.normal
+        # screenshot converted and scaled to the widget size, built lazily in paintEvent
+        self._pixmap: Optional[QPixmap] = None
         self.update_screen()
 
         self.setMouseTracking(True)
@@ -37,13 +59,62 @@ class MonitorWidget(QFrame):
         if self.screenshot is None:
             return
 
-        pixmap = QPixmap(self.screenshot)
         painter = QPainter(self)
-        painter.drawPixmap(0, 0, self.width(), self.height(), pixmap)
+        painter.drawPixmap(0, 0, self._scaled_pixmap())
+
+    # ruff: noqa: N802 - resizeEvent is a PyQt6 method
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self.invalidate_pixmap()
+
+    def invalidate_pixmap(self) -> None:
+        self._pixmap = None
+        self.update()
+
+    @property
+    def applied_monitor(self) -> Monitor:
+        """
+        The output as the compositor has it applied, the edited one if it is not known yet.
+        """
+        return self._applied_monitor(self.monitor.name) or self.monitor
+
+    def display_transform(self) -> QTransform:
+        """
+        Transformation from the captured screenshot to how it looks with the edited transform.
+        """
+        captured = transform_matrix(self._captured_transform)
+        return captured.inverted()[0] * transform_matrix(self.monitor.transform)
+
+    def _scaled_pixmap(self) -> QPixmap:
+        # moving the widget repaints it a lot, conversion and scaling is done only
+        # when the screenshot, its transformation or the widget size changes
+        if self._pixmap is None:
+            ratio = self.devicePixelRatioF()
+            width, height = int(self.width() * ratio), int(self.height() * ratio)
+            matrix = self.display_transform()
+            # scale first so the transformation works on the small image only,
+            # rotation by 90/270 swaps the sides
+            if self._captured_transform.is_rotated != self.monitor.transform.is_rotated:
+                width, height = height, width
+
+            image = self.screenshot.scaled(
+                width,
+                height,
+                Qt.IgnoreAspectRatio,
+                Qt.SmoothTransformation,
+            )
+            if not matrix.isIdentity():
+                image = image.transformed(matrix)
+
+            self._pixmap = QPixmap.fromImage(image)
+            self._pixmap.setDevicePixelRatio(ratio)
+
+        return self._pixmap
 
     # ruff: noqa: N802 - mousePressEvent is a PyQt6 method
     def mousePressEvent(self, event: QPoint) -> None:
         self.drag_start_position = event.pos()
+        self.window().start_dragging(self)
 
         if event.button() == Qt.LeftButton:
             self.window().change_monitor_info_tab(self.monitor.name)
@@ -53,41 +124,30 @@ class MonitorWidget(QFrame):
         if event.buttons() == Qt.LeftButton:
             drag_distance = event.pos() - self.drag_start_position
             new_position = self.pos() + drag_distance
-            self.move(new_position)
             # jump to MainWindow to get info about nearby monitors and do snap there
             # TODO: can qt do this in a better way?
+            self.move(*self.window().snap_to_nearby_monitors(self, new_position))
             self.window().update_monitor_info_positions(self)
-            self.window().snap_to_nearby_monitors(self)
-
-    def update_screen(self):
-        if not shutil.which("grim"):
-            return
 
-        temp_file = tempfile.NamedTemporaryFile(delete=True, suffix=".png")
-        position = f"{self.monitor.position.x},{self.monitor.position.y}"
-        resolution = f"{self.monitor.width}x{self.monitor.height}"
-        run(
-            [
-                "grim",
-                "-o",
-                self.initial_monitor.name,
-                "-g",
-                f"{position} {resolution}",
-                temp_file.name,
-            ],
+    # ruff: noqa: N802 - mouseReleaseEvent is a PyQt6 method
+    def mouseReleaseEvent(self, _) -> None:
+        self.window().stop_dragging()
+
+    def update_screen(self, on_finished: Optional[Callable[[float], None]] = None) -> bool:
+        # capture only as many pixels as the widget can show
+        ratio = self.devicePixelRatioF()
+        # the edited monitor is not applied yet, capture what is really on the screen
+        applied = self.applied_monitor
+        self._requested_transform = applied.transform
+        return request_screenshot(
+            applied.name,
+            applied,
+            self.set_screenshot,
+            target_size=(int(self.width() * ratio), int(self.height() * ratio)),
+            on_finished=on_finished,
         )
-        self.screenshot = QImage(temp_file.name)
 
-    def rotate_screenshot(self, angle: int) -> None:
-        if self.screenshot is None:
-            return
-
-        self.screenshot = self.screenshot.transformed(QTransform().rotate(angle))
-        self.update()
-
-    def mirror_screenshot(self) -> None:
-        if self.screenshot is None:
-            return
-
-        self.screenshot = self.screenshot.transformed(QTransform().scale(-1, 1))
-        self.update()
+    def set_screenshot(self, screenshot: QImage) -> None:
+        self.screenshot = screenshot
+        self._captured_transform = self._requested_transform
+        self.invalidate_pixmap()
@@ -0,0 +1,82 @@
+"""
+outputs are polled in QThreadPool, so a slow wlr-randr never blocks the GUI thread
+"""
+
+from typing import Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+from wayrandr.constants import OUTPUT_POLL_INTERVAL_MS
+from wayrandr.monitor import MonitorDecodeError, get_monitors
+
+
+class OutputReaderSignals(QObject):
+    # list[Monitor]
+    finished = Signal(list)
+    # why wlr-randr failed or what was wrong with its output
+    failed = Signal(str)
+
+
+class OutputReaderJob(QRunnable):
+    def __init__(self) -> None:
+        super().__init__()
+        self.signals = OutputReaderSignals()
+
+    def run(self) -> None:
+        try:
+            # hot-plug is what we are looking for, the cache can't know about it
+            monitors = get_monitors(max_age=0)
+        except (OSError, MonitorDecodeError) as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        self.signals.finished.emit(monitors)
+
+
+class OutputWatcher(QObject):
+    """
+    Periodically reads outputs from the compositor and emits what it got,
+    or why the read failed.
+
+    Comparing it with the previous state is up to the receiver.
+    """
+
+    monitors_read = Signal(list)
+    read_failed = Signal(str)
+
+    def __init__(
+        self,
+        interval: int = OUTPUT_POLL_INTERVAL_MS,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._in_flight = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._poll)
+
+    def start(self) -> None:
+        # read right away, the window is shown before the outputs are known
+        self._poll()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def _poll(self) -> None:
+        if self._in_flight:
+            return
+
+        self._in_flight = True
+        job = OutputReaderJob()
+        job.signals.finished.connect(self._read_finished)
+        job.signals.failed.connect(self._read_failed)
+        QThreadPool.globalInstance().start(job)
+
+    def _read_finished(self, monitors: list) -> None:
+        self._in_flight = False
+        self.monitors_read.emit(monitors)
+
+    def _read_failed(self, error: str) -> None:
+        self._in_flight = False
+        self.read_failed.emit(error)
@@ -0,0 +1,97 @@
+"""
+screenshots of outputs are taken by grim in QThreadPool, so the GUI thread never waits for them
+"""
+
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QImage
+
+from wayrandr.capture import (
+    DEFAULT_CAPTURE_FORMAT,
+    CaptureFormat,
+    capture,
+    is_available,
+    thumbnail_scale,
+)
+from wayrandr.layout import logical_size
+from wayrandr.monitor import Monitor
+
+
+class ScreenshotSignals(QObject):
+    captured = Signal(QImage)
+    # emitted after every attempt, even a failed one, with its duration in ms
+    finished = Signal(float)
+
+
+class ScreenshotJob(QRunnable):
+    def __init__(
+        self,
+        output_name: str,
+        geometry: str,
+        image_format: CaptureFormat,
+        scale: Optional[float],
+    ) -> None:
+        super().__init__()
+        self.output_name = output_name
+        self.geometry = geometry
+        self.image_format = image_format
+        self.scale = scale
+        # QRunnable is not a QObject, it can't have signals on its own
+        self.signals = ScreenshotSignals()
+
+    def run(self) -> None:
+        start = time.monotonic()
+        try:
+            self._capture()
+        finally:
+            self.signals.finished.emit((time.monotonic() - start) * 1000)
+
+    def _capture(self) -> None:
+        data = capture(self.output_name, self.geometry, self.image_format, self.scale)
+        if data is None:
+            return
+
+        # QImage (unlike QPixmap) is safe to create outside of the GUI thread
+        image = QImage.fromData(data, self.image_format.upper())
+        if not image.isNull():
+            self.signals.captured.emit(image)
+
+
+def request_screenshot(
+    output_name: str,
+    monitor: Monitor,
+    on_captured: Callable[[QImage], None],
+    image_format: CaptureFormat = DEFAULT_CAPTURE_FORMAT,
+    target_size: Optional[tuple[int, int]] = None,
+    on_finished: Optional[Callable[[float], None]] = None,
+) -> bool:
+    """
+    Start capturing the output in background, `on_captured` is called in the GUI thread.
+
+    If `target_size` is set, the screenshot is downscaled by grim to fit into it.
+    `on_finished` gets the capture duration in ms, whether the capture succeeded or not.
+
+    Returns False if screenshots are not available at all.
+    """
+    if not is_available():
+        return False
+
+    # grim works in the compositor layout, i.e. with scale and transform applied,
+    # and its scale multiplies that size, not the one of the mode
+    size = logical_size(monitor)
+    position = f"{monitor.position.x},{monitor.position.y}"
+    resolution = f"{size[0]}x{size[1]}"
+    scale = None
+    if target_size is not None:
+        scale = thumbnail_scale(size, target_size)
+
+    job = ScreenshotJob(output_name, f"{position} {resolution}", image_format, scale)
+    job.signals.captured.connect(on_captured)
+    if on_finished is not None:
+        job.signals.finished.connect(on_finished)
+
+    QThreadPool.globalInstance().start(job)
+    return True
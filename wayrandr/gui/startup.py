@@ -0,0 +1,60 @@
+"""
+startup instrumentation, set WAYRANDR_STARTUP_TIMES=1 to print to stderr
+how long it took until imports were done, the window was painted and outputs were read
+
+with WAYRANDR_STARTUP_TIMES=exit the application quits once all of it happened
+(a failed read of outputs counts as read),
+scripts/startup_benchmark.py uses it
+"""
+
+import os
+import sys
+import time
+from typing import Optional
+
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication, QMainWindow
+
+from wayrandr.constants import STARTUP_TIMES_ENV
+
+
+class StartupTimer(QObject):
+    def __init__(self, started: float, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.started = started
+        self.mode = os.environ.get(STARTUP_TIMES_ENV)
+        self._painted = False
+        self._outputs_read = False
+
+    def mark(self, phase: str) -> None:
+        if self.mode:
+            elapsed = (time.perf_counter() - self.started) * 1000
+            print(f"{phase}: {elapsed:.1f} ms", file=sys.stderr)
+
+    def watch(self, window: QMainWindow) -> None:
+        window.installEventFilter(self)
+        # a failed read counts too, the window is as ready as it gets
+        window.output_watcher.monitors_read.connect(self._outputs_read_done)
+        window.output_watcher.read_failed.connect(self._outputs_read_done)
+
+    # ruff: noqa: N802 - eventFilter is a PyQt6 method
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if not self._painted and event.type() == QEvent.Type.Paint:
+            self._painted = True
+            self.mark("first paint")
+            self._maybe_quit()
+
+        return False
+
+    def _outputs_read_done(self, _result: object) -> None:
+        if self._outputs_read:
+            return
+
+        self._outputs_read = True
+        self.mark("outputs read")
+        self._maybe_quit()
+
+    def _maybe_quit(self) -> None:
+        if self.mode == "exit" and self._painted and self._outputs_read:
+            # let the widgets of the outputs paint first
+            QTimer.singleShot(0, QApplication.quit)
@@ -1,142 +1,718 @@
-# import re
-# from dataclasses import dataclass
-# from typing import Optional
-#
-#
-# @dataclass
-# class OutputDirective:
-#    criteria: str
-#    directives: list[str]
-#
-#
-# @dataclass
-# class Profile:
-#    outputs: list[OutputDirective]
-#    exec: list[str] = []
-#    name: Optional[str] = None
-#
-#
-# @dataclass
-# class KanshiConfig:
-#    profiles: list[Profile]
-#    includes: list[str]
-#
-#
-# def parse_kanshi_config(file_path: str) -> KanshiConfig:
-#    """
-#    Parses an existing kanshi configuration file and returns a KanshiConfig object.
-#    """
-#    config = KanshiConfig()
-#    current_profile = None
-#
-#    with open(file_path) as f:
-#        lines = f.readlines()
-#
-#    profile_re = re.compile(r"profile\s*(\w+)?\s*\{")
-#    output_re = re.compile(r"output\s+(.+?)(?:\s*\{|\s*(.+))?")
-#    exec_re = re.compile(r"exec\s+(.+)")
-#    include_re = re.compile(r"include\s+(.+)")
-#
-#    for line in lines:
-#        line = line.strip()
-#
-#        # Handle includes
-#        include_match = include_re.match(line)
-#        if include_match:
-#            config.includes.append(include_match.group(1))
-#            continue
-#
-#        # Handle profile start
-#        profile_match = profile_re.match(line)
-#        if profile_match:
-#            if current_profile:
-#                config.profiles.append(current_profile)
-#            current_profile = Profile(name=profile_match.group(1))
-#            continue
-#
-#        # Handle output directives
-#        output_match = output_re.match(line)
-#        if output_match and current_profile:
-#            criteria = output_match.group(1)
-#            directives = output_match.group(2).split() if output_match.group(2) else []
-#            current_profile.outputs.append(
-#                OutputDirective(criteria=criteria, directives=directives)
-#            )
-#            continue
-#
-#        # Handle exec commands
-#        exec_match = exec_re.match(line)
-#        if exec_match and current_profile:
-#            current_profile.exec_commands.append(exec_match.group(1))
-#            continue
-#
-#        # Handle profile end
-#        if line == "}":
-#            if current_profile:
-#                config.profiles.append(current_profile)
-#                current_profile = None
-#
-#    return config
-#
-#
-# def update_kanshi_config(config: KanshiConfig, profile_name: str, new_output: OutputDirective):
-#    """
-#    Updates the specified profile with a new output directive or adds
-#     the profile if it doesn't exist.
-#    """
-#    for profile in config.profiles:
-#        if profile.name == profile_name:
-#            profile.outputs.append(new_output)
-#            return
-#
-#    # If profile doesn't exist, add a new one
-#    new_profile = Profile(name=profile_name, outputs=[new_output])
-#    config.profiles.append(new_profile)
-#
-#
-# def write_kanshi_config(file_path: str, config: KanshiConfig):
-#    """
-#    Writes the KanshiConfig object back to the config file without overwriting untouched lines.
-#    """
-#    lines_to_write = []
-#
-#    # Handle includes
-#    for include in config.includes:
-#        lines_to_write.append(f"include {include}")
-#
-#    # Handle profiles and their directives
-#    for profile in config.profiles:
-#        if profile.name:
-#            lines_to_write.append(f"profile {profile.name} {{")
-#        else:
-#            lines_to_write.append("profile {")
-#
-#        for output in profile.outputs:
-#            if output.directives:
-#                lines_to_write.append(
-#                  f'    output {output.criteria} {" ".join(output.directives)}')
-#            else:
-#                lines_to_write.append(f"    output {output.criteria} {{ }}")
-#
-#        for command in profile.exec_commands:
-#            lines_to_write.append(f"    exec {command}")
-#
-#        lines_to_write.append("}")
-#
-#    # Write everything to file
-#    with open(file_path, "w") as f:
-#        f.write("\n".join(lines_to_write))
-#
-#
-## Example Usage:
-#
-## Parse an existing config
-## kanshi_config = "~/path/to/kanshi/config".replace("~", str(Path.home()))
-## config = parse_kanshi_config(kanshi_config)
-#
-## Add a new output to a profile
-## new_output = OutputDirective(criteria="HDMI-A-1", directives=["enable", "mode 1920x1080@60Hz"])
-## update_kanshi_config(config, "nomad", new_output)
-#
-## Save the modified config back to the file
-## write_kanshi_config("/path/to/kanshi/config", config)
+"""
+parser and writer of the kanshi configuration (see kanshi(5))
+
+parsed config remembers the original text, so writing it back changes only
+the statements that were edited, comments and formatting of the rest stay as they were
+"""
+
+import glob
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque
+from collections.abc import Iterable, Iterator
+from copy import deepcopy
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Union
+
+from wayrandr.monitor import Monitor, Position, Transform
+
+
+class KanshiParseError(Exception):
+    def __init__(self, message: str, path: Optional[str], line: int) -> None:
+        location = f"{path or '<string>'}:{line}"
+        super().__init__(f"{location}: {message}")
+        self.path = path
+        self.line = line
+
+
+class TokenType(Enum):
+    word = "word"
+    open_brace = "{"
+    close_brace = "}"
+    newline = "newline"
+    end = "end"
+
+
+@dataclass
+class Token:
+    type: TokenType
+    value: str
+    start: int
+    end: int
+    line: int
+
+
+class Tokenizer:
+    """
+    Lazily splits the config into words, braces and newlines.
+
+    Comments and other whitespace are skipped, they are kept only in the source text.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None) -> None:
+        self.source = source
+        self.path = path
+        self.position = 0
+        self.line = 1
+
+    def _skip_blanks(self) -> None:
+        source = self.source
+        while self.position < len(source):
+            char = source[self.position]
+            if char == "#":
+                end = source.find("\n", self.position)
+                self.position = len(source) if end == -1 else end
+            elif char in " \t\r" or (char == "\\" and source.startswith("\\\n", self.position)):
+                # backslash-newline joins lines
+                if char == "\\":
+                    self.position += 1
+                    self.line += 1
+
+                self.position += 1
+            else:
+                return
+
+    def _quoted(self, start: int) -> Token:
+        source = self.source
+        value = []
+        position = start + 1
+        while position < len(source):
+            char = source[position]
+            if char == "\\" and position + 1 < len(source):
+                value.append(source[position + 1])
+                position += 2
+            elif char == '"':
+                self.position = position + 1
+                return Token(TokenType.word, "".join(value), start, self.position, self.line)
+            elif char == "\n":
+                break
+            else:
+                value.append(char)
+                position += 1
+
+        raise KanshiParseError("Unterminated quoted string", self.path, self.line)
+
+    def next(self) -> Token:
+        self._skip_blanks()
+        source = self.source
+        start = self.position
+        if start >= len(source):
+            return Token(TokenType.end, "", start, start, self.line)
+
+        char = source[start]
+        if char == "\n":
+            self.position += 1
+            self.line += 1
+            return Token(TokenType.newline, char, start, self.position, self.line - 1)
+
+        if char in "{}":
+            self.position += 1
+            return Token(TokenType(char), char, start, self.position, self.line)
+
+        if char == '"':
+            return self._quoted(start)
+
+        end = start
+        while end < len(source) and source[end] not in " \t\r\n{}#":
+            end += 1
+
+        self.position = end
+        return Token(TokenType.word, source[start:end], start, end, self.line)
+
+    def rest_of_line(self) -> tuple[str, int]:
+        """
+        Raw text up to the end of line (used by exec), returns it with its end offset.
+        """
+        self._skip_blanks()
+        end = self.source.find("\n", self.position)
+        if end == -1:
+            end = len(self.source)
+
+        text = self.source[self.position : end].rstrip()
+        self.position = end
+        return text, self.position
+
+    def __iter__(self) -> Iterator[Token]:
+        while True:
+            token = self.next()
+            yield token
+            if token.type == TokenType.end:
+                return
+
+
+def quote(value: str) -> str:
+    if value and not any(char in value for char in ' \t"\\{}#'):
+        return value
+
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+@dataclass(eq=False)
+class Node(ABC):
+    # offsets of the statement in the source, None for statements created by hand
+    span: Optional[tuple[int, int]] = field(default=None, kw_only=True)
+    # whitespace and comments in front of the statement
+    leading: str = field(default="\n", kw_only=True)
+    # text the statement was parsed from
+    source: Optional[str] = field(default=None, kw_only=True, repr=False)
+    _parsed_state: object = field(default=None, kw_only=True, repr=False)
+
+    @abstractmethod
+    def state(self) -> object:
+        """
+        What the rendered text depends on, compared to tell if the statement was edited.
+        """
+
+    def mark_parsed(self, source: str, start: int, end: int) -> None:
+        self.source = source
+        self.span = (start, end)
+        self._parsed_state = self.state()
+
+    @property
+    def modified(self) -> bool:
+        return self.span is None or self.state() != self._parsed_state
+
+    @abstractmethod
+    def render(self) -> str:
+        """
+        Text of the statement built from its current state.
+        """
+
+    def text(self) -> str:
+        """
+        The original text if the statement is unchanged, newly rendered otherwise.
+        """
+        if self.source is not None and self.span is not None and not self.modified:
+            return self.source[self.span[0] : self.span[1]]
+
+        return self.render()
+
+
+@dataclass(eq=False)
+class Output(Node):
+    criteria: str
+    directives: list[str] = field(default_factory=list)
+
+    def state(self) -> object:
+        return self.criteria, tuple(self.directives)
+
+    def render(self) -> str:
+        return " ".join(["output", quote(self.criteria), *self.directives])
+
+
+@dataclass(eq=False)
+class Exec(Node):
+    command: str
+
+    def state(self) -> object:
+        return self.command
+
+    def render(self) -> str:
+        return f"exec {self.command}"
+
+
+@dataclass(eq=False)
+class Include(Node):
+    path: str
+
+    def state(self) -> object:
+        return self.path
+
+    def render(self) -> str:
+        return f"include {quote(self.path)}"
+
+
+@dataclass(eq=False)
+class Profile(Node):
+    name: Optional[str] = None
+    statements: list[Union[Output, Exec]] = field(default_factory=list)
+    # original "profile name {" text and whitespace/comments before "}"
+    header: Optional[str] = field(default=None, repr=False)
+    trailing: str = field(default="\n", repr=False)
+
+    def state(self) -> object:
+        return self.name, tuple(id(statement) for statement in self.statements)
+
+    @property
+    def modified(self) -> bool:
+        return super().modified or any(statement.modified for statement in self.statements)
+
+    @property
+    def outputs(self) -> list[Output]:
+        return [statement for statement in self.statements if isinstance(statement, Output)]
+
+    @property
+    def execs(self) -> list[Exec]:
+        return [statement for statement in self.statements if isinstance(statement, Exec)]
+
+    def render(self) -> str:
+        header = self.header
+        if header is None or self.name != self._parsed_state[0]:
+            header = "profile {" if self.name is None else f"profile {quote(self.name)} {{"
+
+        body = []
+        for statement in self.statements:
+            leading = statement.leading
+            if statement.span is None:
+                leading = "\n    "
+
+            body.append(leading + statement.text())
+
+        return header + "".join(body) + self.trailing + "}"
+
+
+Statement = Union[Profile, Output, Include]
+
+
+@dataclass
+class KanshiConfig:
+    statements: list[Statement] = field(default_factory=list)
+    path: Optional[str] = None
+    # whitespace and comments after the last statement
+    trailing: str = "\n"
+
+    @property
+    def profiles(self) -> list[Profile]:
+        return [statement for statement in self.statements if isinstance(statement, Profile)]
+
+    @property
+    def includes(self) -> list[Include]:
+        return [statement for statement in self.statements if isinstance(statement, Include)]
+
+    def get_profile(self, name: str) -> Optional[Profile]:
+        for profile in self.profiles:
+            if profile.name == name:
+                return profile
+
+        return None
+
+    def render(self) -> str:
+        result = []
+        for index, statement in enumerate(self.statements):
+            leading = statement.leading
+            if statement.span is None:
+                leading = "\n\n" if index else ""
+
+            result.append(leading + statement.text())
+
+        return "".join(result) + self.trailing
+
+
+class Parser:
+    def __init__(self, source: str, path: Optional[str] = None) -> None:
+        self.source = source
+        self.path = path
+        self.tokenizer = Tokenizer(source, path)
+        self._token = self.tokenizer.next()
+        # end of the previous statement, the text after it is leading trivia of the next one
+        self._last_end = 0
+
+    def _advance(self) -> Token:
+        token = self._token
+        self._token = self.tokenizer.next()
+        return token
+
+    def _error(self, message: str) -> KanshiParseError:
+        return KanshiParseError(message, self.path, self._token.line)
+
+    def _expect_word(self, what: str) -> Token:
+        if self._token.type != TokenType.word:
+            raise self._error(f"Expected {what}")
+
+        return self._advance()
+
+    def _skip_newlines(self) -> None:
+        while self._token.type == TokenType.newline:
+            self._advance()
+
+    def _finish(self, node: Node, start: int, end: int) -> Node:
+        node.leading = self.source[self._last_end : start]
+        node.mark_parsed(self.source, start, end)
+        self._last_end = end
+        return node
+
+    def _end_of_statement(self) -> None:
+        if self._token.type not in (TokenType.newline, TokenType.end, TokenType.close_brace):
+            raise self._error(f"Unexpected {self._token.value!r}")
+
+    def _parse_output(self, start: int) -> Output:
+        criteria = self._expect_word("output criteria")
+        directives = []
+        end = criteria.end
+        if self._token.type == TokenType.open_brace:
+            self._advance()
+            self._skip_newlines()
+            while self._token.type == TokenType.word:
+                directives.append(self._advance().value)
+                self._skip_newlines()
+
+            if self._token.type != TokenType.close_brace:
+                raise self._error("Expected } closing output block")
+
+            end = self._advance().end
+        else:
+            while self._token.type == TokenType.word:
+                token = self._advance()
+                directives.append(token.value)
+                end = token.end
+
+        self._end_of_statement()
+        output = Output(criteria.value, directives)
+        return self._finish(output, start, end)
+
+    def _parse_exec(self, start: int) -> Exec:
+        if self._token.type in (TokenType.newline, TokenType.end):
+            raise self._error("Expected command after exec")
+
+        # the command is passed to shell as is, don't tokenize it, go back to the start
+        # of the token read ahead and take the whole line
+        self.tokenizer.position = self._token.start
+        command, end = self.tokenizer.rest_of_line()
+        self._token = self.tokenizer.next()
+        return self._finish(Exec(command), start, end)
+
+    def _parse_profile(self, start: int) -> Profile:
+        name = None
+        if self._token.type == TokenType.word:
+            name = self._advance().value
+
+        if self._token.type != TokenType.open_brace:
+            raise self._error("Expected { after profile")
+
+        brace = self._advance()
+        profile = Profile(name=name, header=self.source[start : brace.end])
+        leading = self.source[self._last_end : start]
+        self._last_end = brace.end
+        while True:
+            self._skip_newlines()
+            token = self._token
+            if token.type == TokenType.close_brace:
+                break
+
+            if token.type == TokenType.end:
+                raise self._error("Expected } closing profile")
+
+            keyword = self._expect_word("output or exec")
+            if keyword.value == "output":
+                profile.statements.append(self._parse_output(keyword.start))
+            elif keyword.value == "exec":
+                profile.statements.append(self._parse_exec(keyword.start))
+            else:
+                raise KanshiParseError(
+                    f"Unknown profile directive {keyword.value!r}",
+                    self.path,
+                    keyword.line,
+                )
+
+        closing = self._advance()
+        profile.trailing = self.source[self._last_end : closing.start]
+        profile.leading = leading
+        profile.mark_parsed(self.source, start, closing.end)
+        self._last_end = closing.end
+        return profile
+
+    def statements(self) -> Iterator[Statement]:
+        """
+        Yield top level statements one by one as they are parsed.
+        """
+        while True:
+            self._skip_newlines()
+            if self._token.type == TokenType.end:
+                return
+
+            keyword = self._expect_word("profile, output or include")
+            if keyword.value == "profile":
+                statement: Statement = self._parse_profile(keyword.start)
+            elif keyword.value == "output":
+                statement = self._parse_output(keyword.start)
+            elif keyword.value == "include":
+                path = self._expect_word("include path")
+                self._end_of_statement()
+                statement = self._finish(Include(path.value), keyword.start, path.end)
+            else:
+                raise KanshiParseError(
+                    f"Unknown directive {keyword.value!r}",
+                    self.path,
+                    keyword.line,
+                )
+
+            yield statement
+
+    def parse(self) -> KanshiConfig:
+        config = KanshiConfig(path=self.path)
+        config.statements.extend(self.statements())
+
+        config.trailing = self.source[self._last_end :]
+        return config
+
+
+def parse(source: str, path: Optional[str] = None) -> KanshiConfig:
+    return Parser(source, path).parse()
+
+
+def default_config_path() -> Path:
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return Path(config_home) / "kanshi" / "config"
+
+
+def load(path: Union[str, Path], follow_includes: bool = True) -> list[KanshiConfig]:
+    """
+    Parse the config and, optionally, all the files it includes (recursively).
+
+    Every file is parsed exactly once even if it is included multiple times, so the
+    whole include tree is parsed in linear time. The first config is the root one.
+    """
+    result = []
+    seen = set()
+    pending = deque([Path(path)])
+    while pending:
+        current = pending.popleft()
+        real_path = os.path.realpath(current)
+        if real_path in seen:
+            continue
+
+        seen.add(real_path)
+        config = parse(current.read_text(), str(current))
+        result.append(config)
+        if not follow_includes:
+            continue
+
+        for include in config.includes:
+            pattern = os.path.expandvars(os.path.expanduser(include.path))
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(current.parent, pattern)
+
+            pending.extend(Path(match) for match in sorted(glob.glob(pattern)))
+
+    return result
+
+
+def write(config: KanshiConfig, path: Optional[Union[str, Path]] = None) -> None:
+    target = Path(path or config.path or default_config_path())
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(config.render())
+
+
+def monitor_criteria(monitor: Monitor) -> str:
+    # description survives plugging the monitor into another port, name doesn't,
+    # but it is ambiguous without serial number
+    if monitor.serial is None:
+        return monitor.name
+
+    return monitor.description
+
+
+def monitor_directives(monitor: Monitor) -> list[str]:
+    if not monitor.enabled:
+        return ["disable"]
+
+    directives = ["enable"]
+    mode = monitor.active_mode
+    # outputs without modes keep whatever the compositor gives them
+    if mode is not None:
+        directives += ["mode", f"{mode.width}x{mode.height}@{mode.refresh}Hz"]
+
+    return [
+        *directives,
+        "position",
+        f"{monitor.position.x},{monitor.position.y}",
+        "scale",
+        str(monitor.scale),
+        "transform",
+        str(monitor.transform),
+    ]
+
+
+_MODE_PATTERN = re.compile(r"(\d+)x(\d+)(?:@(\d+(?:\.\d+)?)(?:Hz)?)?")
+
+
+def apply_directives(monitor: Monitor, directives: list[str]) -> None:
+    """
+    Change the monitor the way kanshi would for the output directives.
+
+    Directives wayrandr doesn't manage (adaptive_sync, alias) are skipped. Raises
+    ValueError for a malformed directive or a mode the monitor doesn't have.
+    """
+    words = iter(directives)
+    for directive in words:
+        if directive == "enable":
+            monitor.enabled = True
+        elif directive == "disable":
+            monitor.enabled = False
+        elif directive == "mode":
+            value = next(words, "")
+            if value == "--custom":
+                value = next(words, "")
+
+            match = _MODE_PATTERN.fullmatch(value)
+            if match is None:
+                raise ValueError(f"Invalid mode of {monitor.name}: {value}")
+
+            width, height, refresh = int(match[1]), int(match[2]), match[3]
+            # kanshi picks the highest refresh rate when none is given
+            if refresh is None:
+                mode = monitor.mode_table.best_refresh(width, height)
+            else:
+                mode = monitor.mode_table.closest(width, height, float(refresh))
+
+            if mode is None or (mode.width, mode.height) != (width, height):
+                raise ValueError(f"{monitor.name} doesn't support mode {value}")
+
+            monitor.active_mode = mode
+        elif directive == "position":
+            x, _, y = next(words, "").partition(",")
+            monitor.position = Position(x=int(x), y=int(y))
+        elif directive == "scale":
+            monitor.scale = float(next(words, ""))
+        elif directive == "transform":
+            monitor.transform = Transform(next(words, ""))
+        elif directive in ("adaptive_sync", "alias"):
+            next(words, None)
+
+
+def apply_profile(profile: Profile, monitors: list[Monitor]) -> list[Monitor]:
+    """
+    Copies of the monitors configured by the profile.
+
+    Outputs with exact criteria are matched first, wildcards take the remaining
+    monitors in order. Monitors the profile doesn't mention are returned unchanged.
+    """
+    result = deepcopy(monitors)
+    unmatched = list(result)
+    outputs = sorted(profile.outputs, key=lambda output: output.criteria == "*")
+    for output in outputs:
+        for monitor in unmatched:
+            if output.criteria in ("*", monitor.name, monitor.description):
+                # outputs of a profile are enabled unless said otherwise
+                monitor.enabled = True
+                apply_directives(monitor, output.directives)
+                unmatched.remove(monitor)
+                break
+
+    return result
+
+
+def set_profile(
+    config: KanshiConfig,
+    name: str,
+    monitors: list[Monitor],
+    remove_missing: bool = True,
+) -> Profile:
+    """
+    Make the profile describe the given monitors, create it if needed.
+
+    With `remove_missing`, outputs of other monitors are dropped from the profile.
+    Outputs that didn't change and exec statements keep their original text.
+    """
+    profile = config.get_profile(name)
+    if profile is None:
+        profile = Profile(name=name)
+        config.statements.append(profile)
+
+    existing = {output.criteria: output for output in profile.outputs}
+    outputs = [] if remove_missing else profile.outputs
+    for monitor in monitors:
+        output = existing.get(monitor_criteria(monitor)) or existing.get(monitor.name)
+        directives = monitor_directives(monitor)
+        if output is None:
+            output = Output(monitor_criteria(monitor), directives)
+            outputs.append(output)
+        else:
+            if output.directives != directives:
+                output.directives = directives
+
+            if remove_missing:
+                outputs.append(output)
+
+    profile.statements = outputs + profile.execs
+    return profile
+
+
+class ProfileIndex:
+    """
+    Finds the profile kanshi would enable for the connected outputs.
+
+    A profile matches when every output statement matches a distinct connected output
+    and no other output is connected; the first matching one wins. Profiles are
+    indexed by their criteria, so only profiles mentioning a connected output (or
+    consisting of wildcards only) are ever looked at, no matter how many there are.
+    """
+
+    def __init__(self, profiles: Iterable[Profile]) -> None:
+        self.profiles: list[Profile] = []
+        self._by_criteria: dict[str, list[int]] = defaultdict(list)
+        # non-wildcard criteria of every profile, repeated ones (e.g. two identical
+        # monitors without serial number) are counted
+        self._criteria: list[Counter[str]] = []
+        self._wildcard_counts: list[int] = []
+        # number of outputs -> profiles with wildcard criteria only
+        self._wildcard_only: dict[int, list[int]] = defaultdict(list)
+
+        for position, profile in enumerate(profiles):
+            criteria = Counter(
+                output.criteria for output in profile.outputs if output.criteria != "*"
+            )
+            wildcards = sum(1 for output in profile.outputs if output.criteria == "*")
+            self.profiles.append(profile)
+            self._criteria.append(criteria)
+            self._wildcard_counts.append(wildcards)
+            if not criteria:
+                self._wildcard_only[wildcards].append(position)
+
+            for criterion in criteria:
+                self._by_criteria[criterion].append(position)
+
+    @classmethod
+    def from_configs(cls, configs: Iterable[KanshiConfig]) -> "ProfileIndex":
+        return cls(profile for config in configs for profile in config.profiles)
+
+    def match(self, monitors: list[Monitor]) -> Optional[Profile]:
+        matched_criteria: dict[int, set[str]] = defaultdict(set)
+        for monitor in monitors:
+            for identifier in {monitor.name, monitor.description}:
+                for position in self._by_criteria.get(identifier, ()):
+                    matched_criteria[position].add(identifier)
+
+        candidates = list(self._wildcard_only.get(len(monitors), ()))
+        for position, criteria in matched_criteria.items():
+            expected = self._criteria[position]
+            if (
+                len(criteria) == len(expected)
+                and expected.total() + self._wildcard_counts[position] == len(monitors)
+                and _assignable(expected, monitors)
+            ):
+                candidates.append(position)
+
+        if not candidates:
+            return None
+
+        return self.profiles[min(candidates)]
+
+
+def _assignable(criteria: Counter[str], monitors: list[Monitor]) -> bool:
+    """
+    Whether every output statement can get its own connected monitor.
+    """
+    statements = list(criteria.elements())
+    # monitor index -> statement index, found by augmenting paths (Kuhn's algorithm),
+    # profiles have a handful of outputs, so this is cheap
+    assigned: dict[int, int] = {}
+
+    def assign(statement: int, visited: set[int]) -> bool:
+        criterion = statements[statement]
+        for index, monitor in enumerate(monitors):
+            if index in visited or criterion not in (monitor.name, monitor.description):
+                continue
+
+            visited.add(index)
+            if index not in assigned or assign(assigned[index], visited):
+                assigned[index] = statement
+                return True
+
+        return False
+
+    return all(assign(statement, set()) for statement in range(len(statements)))
@@ -0,0 +1,122 @@
+"""
+headless layout of the outputs in logical (compositor) coordinates
+
+the GUI only renders this, all the maths is done here on integers
+"""
+
+from enum import StrEnum
+from typing import Optional
+
+from wayrandr.constants import GRID_SCALING, SNAP_DISTANCE
+from wayrandr.helpers import apply_scaling
+from wayrandr.monitor import Monitor, MonitorSnapshot
+from wayrandr.snapping import Rect, SnapIndex
+
+
+class Edge(StrEnum):
+    left = "left"
+    right = "right"
+    top = "top"
+    bottom = "bottom"
+
+
+def logical_size(monitor: Monitor) -> tuple[int, int]:
+    """
+    Size of the output in the compositor layout, i.e. with scale and transform applied.
+    """
+    # outputs without modes take no space
+    width, height = monitor.width, monitor.height
+    if monitor.transform.is_rotated:
+        width, height = height, width
+
+    scale = monitor.scale or 1
+    return round(width / scale), round(height / scale)
+
+
+def canvas_size(monitor: Monitor) -> tuple[int, int]:
+    width, height = logical_size(monitor)
+    return apply_scaling(width), apply_scaling(height)
+
+
+class Layout:
+    def __init__(self, monitors: MonitorSnapshot) -> None:
+        self.monitors = monitors
+
+    def rect(self, name: str) -> Rect:
+        monitor = self.monitors[name]
+        return Rect(monitor.position.x, monitor.position.y, *logical_size(monitor))
+
+    def rects(self) -> dict[str, Rect]:
+        return {monitor.name: self.rect(monitor.name) for monitor in self.monitors}
+
+    def canvas_rect(self, name: str) -> Rect:
+        rect = self.rect(name)
+        return Rect(
+            apply_scaling(rect.x),
+            apply_scaling(rect.y),
+            apply_scaling(rect.width),
+            apply_scaling(rect.height),
+        )
+
+    @staticmethod
+    def from_canvas(x: int, y: int) -> tuple[int, int]:
+        return x * GRID_SCALING, y * GRID_SCALING
+
+    def move(self, name: str, x: int, y: int) -> Rect:
+        position = self.monitors[name].position
+        position.x = x
+        position.y = y
+        return self.rect(name)
+
+    def snap_index(self, name: str) -> SnapIndex:
+        """
+        Index of edges of all the other outputs, valid until one of them changes.
+        """
+        return SnapIndex(
+            (self.rect(monitor.name) for monitor in self.monitors if monitor.name != name),
+            distance=SNAP_DISTANCE * GRID_SCALING,
+        )
+
+    def snap(self, name: str, x: int, y: int, index: Optional[SnapIndex] = None) -> Rect:
+        """
+        Move the output to (x, y) snapped to edges of the other outputs.
+        """
+        if index is None:
+            index = self.snap_index(name)
+
+        rect = self.rect(name).moved_to(x, y)
+        return self.move(name, *index.snap(rect))
+
+    def align(self, name: str, reference: str, edge: Edge) -> Rect:
+        """
+        Align the edge of the output with the same edge of the reference output.
+        """
+        rect = self.rect(name)
+        reference_rect = self.rect(reference)
+        x, y = rect.x, rect.y
+        if edge == Edge.left:
+            x = reference_rect.x
+        elif edge == Edge.right:
+            x = reference_rect.right - rect.width
+        elif edge == Edge.top:
+            y = reference_rect.y
+        else:
+            y = reference_rect.bottom - rect.height
+
+        return self.move(name, x, y)
+
+    def normalize(self) -> None:
+        """
+        Shift the whole layout so the enabled outputs start at (0, 0).
+        """
+        rects = [self.rect(monitor.name) for monitor in self.monitors if monitor.enabled]
+        if not rects:
+            return
+
+        dx = min(rect.x for rect in rects)
+        dy = min(rect.y for rect in rects)
+        if dx == 0 and dy == 0:
+            return
+
+        for monitor in self.monitors:
+            self.move(monitor.name, monitor.position.x - dx, monitor.position.y - dy)
@@ -1,14 +1,27 @@
 import sys
+import time
 
-from PySide6.QtWidgets import QApplication
-
-from wayrandr.gui import MainWindow
+from wayrandr.command import cancel_all
 
 
 def run() -> None:
+    started = time.perf_counter()
+    # Qt and the widgets are imported here, the headless CLI never gets to pay for them
+    from PySide6.QtWidgets import QApplication
+
+    from wayrandr.gui import MainWindow
+    from wayrandr.gui.startup import StartupTimer
+
+    startup_timer = StartupTimer(started)
+    startup_timer.mark("imports")
+
     app = QApplication(sys.argv)
+    # don't wait for hung tools in the thread pool on exit
+    app.aboutToQuit.connect(cancel_all)
     window = MainWindow()
+    startup_timer.watch(window)
     window.show()
+    startup_timer.mark("window shown")
     sys.exit(app.exec())
 
 
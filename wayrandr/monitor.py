@@ -1,12 +1,21 @@
-import json
-from dataclasses import dataclass
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass, field, replace
 from enum import StrEnum
 from functools import cached_property
-from subprocess import run
+from types import MappingProxyType
 from typing import Optional
 
+from wayrandr.command import run_command
+from wayrandr.constants import OUTPUT_STATE_TTL_S
 from wayrandr.helpers import apply_scaling
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 
 class Transform(StrEnum):
     normal = "normal"
@@ -19,53 +28,48 @@ class Transform(StrEnum):
     flipped_270 = "flipped-270"
 
     @staticmethod
-    def _map() -> dict:
-        return {
-            # 0-3 UI buttons
-            Transform.normal: 0,
-            Transform.normal_90: 1,
-            Transform.normal_180: 2,
-            Transform.normal_270: 3,
-            Transform.flipped: 4,
-            Transform.flipped_90: 5,
-            Transform.flipped_180: 6,
-            Transform.flipped_270: 7,
-        }
+    def _map() -> Mapping["Transform", int]:
+        # 0-3 UI buttons, 4-7 the same flipped
+        return _TRANSFORM_INDEX
 
     @classmethod
-    def reverse_map(cls) -> dict:
-        return {v: k for k, v in cls._map().items()}
+    def reverse_map(cls) -> Mapping[int, "Transform"]:
+        return _TRANSFORM_BY_INDEX
 
     def value_index(self) -> int:
-        return self._map()[self]
+        return _TRANSFORM_INDEX[self]
 
     def flipped_value(self) -> "Transform":
-        flip_constant = 4
-        flip_num = self._map()[self] + flip_constant
-        if flip_num > len(Transform) - 1:
-            flip_num -= len(Transform)
-
-        return Transform.reverse_map()[flip_num]
+        return _TRANSFORM_BY_INDEX[(_TRANSFORM_INDEX[self] + 4) % len(_TRANSFORM_INDEX)]
 
     @property
     def is_flipped(self) -> bool:
-        return self._map()[self] >= 4
+        return _TRANSFORM_INDEX[self] >= 4
+
+    @property
+    def rotation(self) -> int:
+        """
+        Rotation in degrees, without the flip.
+        """
+        return _TRANSFORM_INDEX[self] % 4 * 90
 
     @property
     def is_rotated(self) -> bool:
-        return self in [
-            self.normal_90,
-            self.normal_270,
-            self.flipped_90,
-            self.flipped_270,
-        ]
+        return _TRANSFORM_INDEX[self] % 2 == 1
 
     @property
     def is_upside_down(self) -> bool:
-        return self in [self.normal_180, self.flipped_180]
+        return _TRANSFORM_INDEX[self] % 4 == 2
 
 
-@dataclass
+# members are declared in the order of their index, the tables never change
+_TRANSFORM_INDEX: Mapping[Transform, int] = MappingProxyType(
+    {transform: index for index, transform in enumerate(Transform)},
+)
+_TRANSFORM_BY_INDEX: Mapping[int, Transform] = MappingProxyType(dict(enumerate(Transform)))
+
+
+@dataclass(slots=True)
 class Mode:
     width: int
     height: int
@@ -74,11 +78,17 @@ class Mode:
     current: bool
 
     def __eq__(self, other) -> bool:
-        return (
-            self.width == other.width
-            and self.height == other.height
-            and self.refresh == other.refresh
-        )
+        if not isinstance(other, Mode):
+            return NotImplemented
+
+        return self.key == other.key
+
+    @property
+    def key(self) -> tuple[int, int, float]:
+        """
+        What identifies the mode, the flags don't.
+        """
+        return self.width, self.height, self.refresh
 
     def __str__(self) -> str:
         return f"{self.width}x{self.height}@{self.refresh}Hz"
@@ -87,7 +97,96 @@ class Mode:
         return apply_scaling(self.width, scale), apply_scaling(self.height, scale)
 
 
-@dataclass
+class ModeTable:
+    """
+    Modes of one monitor indexed by resolution and refresh rate.
+
+    `modes` are sorted by resolution (the biggest first) and then by refresh rate
+    (the highest first). The table is built from a list of modes and doesn't notice
+    later changes of that list, Monitor.mode_table rebuilds it when needed.
+    """
+
+    def __init__(self, modes: list[Mode]) -> None:
+        self._source = modes
+        # the modes as they were, the source list may be changed later
+        self._built_modes = list(modes)
+        # key -> position in the source list, the first one wins for duplicates
+        self._positions: dict[tuple[int, int, float], int] = {}
+        for position, mode in enumerate(modes):
+            self._positions.setdefault(mode.key, position)
+
+        self.modes = sorted(
+            (modes[position] for position in self._positions.values()),
+            key=lambda mode: (mode.width * mode.height, mode.width, mode.refresh),
+            reverse=True,
+        )
+        self._by_resolution: dict[tuple[int, int], list[Mode]] = {}
+        for mode in self.modes:
+            self._by_resolution.setdefault((mode.width, mode.height), []).append(mode)
+
+    def built_from(self, modes: list[Mode]) -> bool:
+        """
+        The table was built from this list and no mode was added, removed or replaced since.
+        """
+        return (
+            modes is self._source
+            and len(modes) == len(self._built_modes)
+            and all(mode is built for mode, built in zip(modes, self._built_modes))
+        )
+
+    def __iter__(self) -> Iterator[Mode]:
+        return iter(self.modes)
+
+    def __len__(self) -> int:
+        return len(self.modes)
+
+    def __contains__(self, mode: Mode) -> bool:
+        return mode.key in self._positions
+
+    def get(self, width: int, height: int, refresh: float) -> Optional[Mode]:
+        position = self._positions.get((width, height, refresh))
+        return None if position is None else self._built_modes[position]
+
+    def position(self, mode: Mode) -> Optional[int]:
+        """
+        Position of the mode in the list the table was built from.
+        """
+        return self._positions.get(mode.key)
+
+    def resolutions(self) -> list[tuple[int, int]]:
+        return list(self._by_resolution)
+
+    def refresh_rates(self, width: int, height: int) -> list[Mode]:
+        return self._by_resolution.get((width, height), [])
+
+    def best_refresh(self, width: int, height: int) -> Optional[Mode]:
+        modes = self.refresh_rates(width, height)
+        return modes[0] if modes else None
+
+    def preferred(self) -> Optional[Mode]:
+        return next((mode for mode in self._built_modes if mode.preferred), None)
+
+    def closest(self, width: int, height: int, refresh: Optional[float] = None) -> Optional[Mode]:
+        """
+        Mode with the closest resolution, then the closest refresh rate (or the highest).
+        """
+        if not self._by_resolution:
+            return None
+
+        if (width, height) not in self._by_resolution:
+            width, height = min(
+                self._by_resolution,
+                key=lambda size: abs(size[0] - width) + abs(size[1] - height),
+            )
+
+        modes = self._by_resolution[(width, height)]
+        if refresh is None:
+            return modes[0]
+
+        return min(modes, key=lambda mode: abs(mode.refresh - refresh))
+
+
+@dataclass(slots=True)
 class Position:
     x: int
     y: int
@@ -108,6 +207,9 @@ class Monitor:
     modes: list[Mode]
     transform: Transform = Transform.normal
     # the rest is not important now
+    # index of the current mode in modes, only a hint validated on every access
+    _active_index: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _mode_table: Optional[ModeTable] = field(default=None, init=False, repr=False, compare=False)
 
     @cached_property
     def description(self) -> str:
@@ -122,12 +224,23 @@ class Monitor:
         return f"{self.make} {model} {serial}"
 
     @property
-    def active_mode(self) -> Mode:
-        for mode in self.modes:
+    def active_mode(self) -> Optional[Mode]:
+        """
+        The current mode, the first one if none is marked current.
+
+        None for outputs without modes, e.g. headless ones.
+        """
+        index = self._active_index
+        # modes can be replaced or flags changed behind our back, check the hint
+        if index is not None and index < len(self.modes) and self.modes[index].current:
+            return self.modes[index]
+
+        for index, mode in enumerate(self.modes):
             if mode.current:
+                self._active_index = index
                 return mode
 
-        return self.modes[0]
+        return self.modes[0] if self.modes else None
 
     @active_mode.setter
     def active_mode(self, value: Mode) -> None:
@@ -135,64 +248,334 @@ class Monitor:
         if prev_active == value:
             return
 
-        prev_active.current = False
-        for mode in self.modes:
-            if mode == value:
-                mode.current = True
-                return
+        if prev_active is not None:
+            prev_active.current = False
+
+        index = self.mode_table.position(value)
+        if index is not None:
+            self.modes[index].current = True
+            self._active_index = index
+
+    @property
+    def mode_table(self) -> ModeTable:
+        table = self._mode_table
+        if table is None or not table.built_from(self.modes):
+            table = self._mode_table = ModeTable(self.modes)
+
+        return table
 
+    # width, height and refresh are 0 for outputs without modes
     @property
     def width(self) -> int:
-        return self.active_mode.width
+        mode = self.active_mode
+        return 0 if mode is None else mode.width
 
     @property
     def height(self) -> int:
-        return self.active_mode.height
+        mode = self.active_mode
+        return 0 if mode is None else mode.height
 
     @property
     def refresh(self) -> int:
-        return self.active_mode.refresh
+        mode = self.active_mode
+        return 0 if mode is None else mode.refresh
+
+
+class MonitorDecodeError(ValueError):
+    """
+    Output of wlr-randr is not valid JSON or doesn't have the expected structure.
+    """
+
 
+_MISSING = object()
 
-def _parse_modes(modes: list[dict]) -> list[Mode]:
+
+def _field(data: dict, key: str, kind: type | tuple[type, ...], path: str, default=_MISSING):
+    value = data.get(key, _MISSING)
+    if value is _MISSING or (value is None and default is not _MISSING):
+        if default is _MISSING:
+            raise MonitorDecodeError(f"{path}.{key} is missing")
+
+        return default
+
+    # bool is an int, but an int field holding true is surely wrong
+    if isinstance(value, bool) != (kind is bool) or not isinstance(value, kind):
+        raise MonitorDecodeError(f"{path}.{key} has unexpected type {type(value).__name__}")
+
+    return value
+
+
+def _object(value: object, path: str) -> dict:
+    if not isinstance(value, dict):
+        raise MonitorDecodeError(f"{path} is not an object")
+
+    return value
+
+
+def _parse_modes(modes: list, path: str) -> list[Mode]:
     result = []
-    for mode in modes:
+    for index, mode in enumerate(modes):
+        mode_path = f"{path}[{index}]"
+        mode = _object(mode, mode_path)
         result.append(
             Mode(
-                width=mode["width"],
-                height=mode["height"],
-                refresh=mode["refresh"],
-                preferred=mode["preferred"],
-                current=mode["current"],
+                width=_field(mode, "width", int, mode_path),
+                height=_field(mode, "height", int, mode_path),
+                refresh=_field(mode, "refresh", (int, float), mode_path),
+                preferred=_field(mode, "preferred", bool, mode_path, False),
+                current=_field(mode, "current", bool, mode_path, False),
             ),
         )
 
     return result
 
 
-def get_monitors() -> list[Monitor]:
-    response = run(["wlr-randr", "--json"], capture_output=True, text=True).stdout
-    data = json.loads(response)
+def parse_monitors(data: object) -> list[Monitor]:
+    """
+    Build monitors from the JSON structure printed by `wlr-randr --json`.
+
+    Only the name is required, the rest falls back to defaults when missing or null.
+    Raises MonitorDecodeError if something has an unexpected type.
+    """
+    if not isinstance(data, list):
+        raise MonitorDecodeError("outputs are not a list")
+
     result = []
-    for monitor in data:
-        mode_json = monitor.get("modes", [])
-        modes = _parse_modes(mode_json)
+    for index, monitor in enumerate(data):
+        path = f"outputs[{index}]"
+        monitor = _object(monitor, path)
+        position = _object(monitor.get("position") or {}, f"{path}.position")
+        try:
+            transform = Transform(_field(monitor, "transform", str, path, Transform.normal))
+        except ValueError as e:
+            raise MonitorDecodeError(f"{path}.transform is unknown") from e
 
         result.append(
             Monitor(
-                name=monitor["name"],
-                make=monitor["make"],
-                model=monitor["model"],
-                serial=monitor.get("serial"),
-                enabled=monitor["enabled"],
-                scale=monitor["scale"],
+                name=_field(monitor, "name", str, path),
+                make=_field(monitor, "make", str, path, "Unknown"),
+                model=_field(monitor, "model", str, path, None),
+                serial=_field(monitor, "serial", str, path, None),
+                enabled=_field(monitor, "enabled", bool, path, False),
+                scale=float(_field(monitor, "scale", (int, float), path, 1.0)),
                 position=Position(
-                    x=monitor["position"]["x"],
-                    y=monitor["position"]["y"],
+                    x=_field(position, "x", int, f"{path}.position", 0),
+                    y=_field(position, "y", int, f"{path}.position", 0),
                 ),
-                modes=modes,
-                transform=Transform(monitor["transform"]),
+                modes=_parse_modes(_field(monitor, "modes", list, path, []), f"{path}.modes"),
+                transform=transform,
             ),
         )
 
     return result
+
+
+def decode_monitors(text: str | bytes) -> list[Monitor]:
+    """
+    Parse output of `wlr-randr --json`, with orjson if it is installed.
+
+    Raises MonitorDecodeError for empty output, invalid JSON and unexpected structure.
+    """
+    if not text.strip():
+        raise MonitorDecodeError("wlr-randr printed nothing")
+
+    try:
+        data = _json_loads(text)
+    except ValueError as e:
+        # both json.JSONDecodeError and orjson.JSONDecodeError are ValueError
+        raise MonitorDecodeError(f"wlr-randr printed invalid JSON: {e}") from e
+
+    return parse_monitors(data)
+
+
+def monitor_to_json(monitor: Monitor) -> dict:
+    """
+    Inverse of parse_monitors, the same structure as `wlr-randr --json` prints.
+    """
+    return {
+        "name": monitor.name,
+        "description": monitor.description,
+        "make": monitor.make,
+        "model": monitor.model,
+        "serial": monitor.serial,
+        "enabled": monitor.enabled,
+        "modes": [
+            {
+                "width": mode.width,
+                "height": mode.height,
+                "refresh": mode.refresh,
+                "preferred": mode.preferred,
+                "current": mode.current,
+            }
+            for mode in monitor.modes
+        ],
+        "position": {"x": monitor.position.x, "y": monitor.position.y},
+        "transform": str(monitor.transform),
+        "scale": monitor.scale,
+    }
+
+
+def read_wlr_randr() -> bytes:
+    """
+    Raises CommandError (an OSError) when wlr-randr fails or times out.
+    """
+    # bytes, orjson would have to encode str back first
+    return run_command(["wlr-randr", "--json"], text=False).check().stdout
+
+
+class OutputStateCache:
+    """
+    Remembers the last output of `reader` (wlr-randr by default) for `ttl` seconds,
+    so repeated reads within one session don't fork it again.
+
+    Whatever changes the outputs has to call invalidate(). The raw JSON is cached,
+    every read decodes fresh monitors that the caller is free to edit.
+    `reader` can be replaced by a stub returning canned JSON.
+    """
+
+    def __init__(
+        self,
+        reader: Callable[[], bytes] = read_wlr_randr,
+        ttl: float = OUTPUT_STATE_TTL_S,
+    ) -> None:
+        self.reader = reader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._raw: Optional[bytes] = None
+        self._read_at = 0.0
+
+    def get(self, max_age: Optional[float] = None) -> list[Monitor]:
+        """
+        Monitors at most `max_age` (default `ttl`) seconds old, 0 always reads.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            raw = self._raw
+            if raw is None or time.monotonic() - self._read_at >= max_age:
+                raw = self.reader()
+                self._raw = raw
+                self._read_at = time.monotonic()
+
+        return decode_monitors(raw)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._raw = None
+
+
+output_state = OutputStateCache()
+
+
+def get_monitors(max_age: Optional[float] = None) -> list[Monitor]:
+    """
+    Connected outputs, from cache if it is younger than `max_age` seconds.
+
+    Raises CommandError (an OSError) when wlr-randr fails or times out
+    and MonitorDecodeError (a ValueError) when its output doesn't make sense.
+    """
+    return output_state.get(max_age)
+
+
+@dataclass
+class MonitorChanges:
+    added: list[Monitor] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    # new state of monitors that are still there but changed (after rename if renamed)
+    changed: list[Monitor] = field(default_factory=list)
+    # old name -> new name, the same physical monitor on a different connector
+    renamed: dict[str, str] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.renamed)
+
+
+def _same_state(old: Monitor, new: Monitor) -> bool:
+    # Mode.__eq__ ignores the current flag, compare the active modes explicitly
+    return old == new and old.active_mode == new.active_mode
+
+
+def compare_monitors(old: list[Monitor], new: list[Monitor]) -> MonitorChanges:
+    old_by_name = {monitor.name: monitor for monitor in old}
+    new_by_name = {monitor.name: monitor for monitor in new}
+    removed = [monitor for monitor in old if monitor.name not in new_by_name]
+    added = [monitor for monitor in new if monitor.name not in old_by_name]
+
+    changes = MonitorChanges()
+    for monitor in list(added):
+        # without serial number two same monitors can't be told apart
+        if monitor.serial is None:
+            continue
+
+        match = next((m for m in removed if m.description == monitor.description), None)
+        if match is None:
+            continue
+
+        removed.remove(match)
+        added.remove(monitor)
+        changes.renamed[match.name] = monitor.name
+        if not _same_state(replace(match, name=monitor.name), monitor):
+            changes.changed.append(monitor)
+
+    for monitor in new:
+        old_monitor = old_by_name.get(monitor.name)
+        if old_monitor is not None and not _same_state(old_monitor, monitor):
+            changes.changed.append(monitor)
+
+    changes.added = added
+    changes.removed = [monitor.name for monitor in removed]
+    return changes
+
+
+class MonitorSnapshot:
+    """
+    Single canonical set of monitors reported by the compositor, keyed by output name.
+
+    Everything in the GUI should share one snapshot so that edits made in one place
+    (info tab, canvas) are visible everywhere else.
+    """
+
+    def __init__(self, monitors: Optional[list[Monitor]] = None) -> None:
+        self._monitors: dict[str, Monitor] = {}
+        if monitors is None:
+            self.refresh()
+        else:
+            self._monitors = {monitor.name: monitor for monitor in monitors}
+
+    def refresh(self) -> None:
+        self._monitors = {monitor.name: monitor for monitor in get_monitors()}
+
+    @property
+    def monitors(self) -> list[Monitor]:
+        return list(self._monitors.values())
+
+    def names(self) -> list[str]:
+        return list(self._monitors)
+
+    def get(self, name: str) -> Optional[Monitor]:
+        return self._monitors.get(name)
+
+    def add(self, monitor: Monitor) -> None:
+        """
+        Add a monitor or replace the one with the same name.
+        """
+        self._monitors[monitor.name] = monitor
+
+    def remove(self, name: str) -> None:
+        self._monitors.pop(name, None)
+
+    def rename(self, old_name: str, new_name: str) -> None:
+        monitor = self._monitors.pop(old_name)
+        monitor.name = new_name
+        self._monitors[new_name] = monitor
+
+    def __getitem__(self, name: str) -> Monitor:
+        return self._monitors[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._monitors
+
+    def __iter__(self) -> Iterator[Monitor]:
+        return iter(self._monitors.values())
+
+    def __len__(self) -> int:
+        return len(self._monitors)
@@ -0,0 +1,186 @@
+"""
+named layouts saved under $XDG_CONFIG_HOME/wayrandr/presets.json
+
+presets are indexed by a fingerprint of the connected monitors (make, model, serial),
+so the one saved for e.g. docked setup is found as soon as the outputs are known
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from copy import deepcopy
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from wayrandr.monitor import (
+    Monitor,
+    MonitorDecodeError,
+    monitor_to_json,
+    parse_monitors,
+)
+
+PRESETS_VERSION = 1
+
+
+class PresetError(Exception):
+    """
+    The preset file can't be read or has unexpected structure.
+    """
+
+
+def default_presets_path() -> Path:
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return Path(config_home) / "wayrandr" / "presets.json"
+
+
+def fingerprint(monitors: list[Monitor]) -> str:
+    """
+    Identifies the set of connected monitors, no matter which port they are plugged in.
+    """
+    # description is make, model and serial
+    descriptions = sorted(monitor.description for monitor in monitors)
+    return hashlib.sha256("\n".join(descriptions).encode()).hexdigest()[:16]
+
+
+def _decode(text: bytes) -> dict:
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise PresetError(f"Invalid JSON: {e}") from e
+
+    if not isinstance(data, dict) or data.get("version") != PRESETS_VERSION:
+        raise PresetError("Unsupported presets file")
+
+    return data
+
+
+@dataclass
+class Preset:
+    name: str
+    fingerprint: str
+    monitors: list[Monitor] = field(default_factory=list)
+
+    @classmethod
+    def from_monitors(cls, name: str, monitors: list[Monitor]) -> "Preset":
+        return cls(name=name, fingerprint=fingerprint(monitors), monitors=deepcopy(monitors))
+
+    def apply_to(self, monitors: list[Monitor]) -> list[Monitor]:
+        """
+        Copies of the monitors configured as the preset says.
+
+        Monitors are matched by description, by name when two of them share one
+        (same model without serial number). Monitors the preset doesn't know stay as they are.
+        """
+        result = deepcopy(monitors)
+        saved = list(self.monitors)
+        for monitor in result:
+            candidates = [m for m in saved if m.description == monitor.description]
+            match = next((m for m in candidates if m.name == monitor.name), None)
+            if match is None and candidates:
+                match = candidates[0]
+
+            if match is None:
+                continue
+
+            saved.remove(match)
+            monitor.enabled = match.enabled
+            monitor.position = deepcopy(match.position)
+            monitor.scale = match.scale
+            monitor.transform = match.transform
+            mode = match.active_mode
+            if mode is not None and mode in monitor.mode_table:
+                monitor.active_mode = mode
+
+        return result
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "fingerprint": self.fingerprint,
+            "outputs": [monitor_to_json(monitor) for monitor in self.monitors],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Preset":
+        return cls(
+            name=data["name"],
+            fingerprint=data["fingerprint"],
+            monitors=parse_monitors(data["outputs"]),
+        )
+
+
+class PresetStore:
+    """
+    Presets of one file, with an index from fingerprint to the presets for it.
+
+    Changes are kept in memory until save().
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        self.path = Path(path or default_presets_path())
+        self._presets: dict[str, Preset] = {}
+        self._by_fingerprint: dict[str, list[str]] = defaultdict(list)
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]] = None) -> "PresetStore":
+        """
+        Raises PresetError, missing file is an empty store.
+        """
+        store = cls(path)
+        if not store.path.exists():
+            return store
+
+        try:
+            data = _decode(store.path.read_bytes())
+            for preset in data["presets"]:
+                store.put(Preset.from_json(preset))
+        except (OSError, KeyError, TypeError, MonitorDecodeError) as e:
+            raise PresetError(f"Can't read presets from {store.path}: {e}") from e
+
+        return store
+
+    def save(self) -> None:
+        data = {
+            "version": PRESETS_VERSION,
+            "presets": [preset.to_json() for preset in self._presets.values()],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # never leave a half written file behind
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(data, indent=2))
+        os.replace(temporary, self.path)
+
+    @property
+    def presets(self) -> list[Preset]:
+        return list(self._presets.values())
+
+    def get(self, name: str) -> Optional[Preset]:
+        return self._presets.get(name)
+
+    def put(self, preset: Preset) -> None:
+        """
+        Add the preset, replacing the one with the same name.
+        """
+        self.remove(preset.name)
+        self._presets[preset.name] = preset
+        self._by_fingerprint[preset.fingerprint].append(preset.name)
+
+    def remove(self, name: str) -> Optional[Preset]:
+        preset = self._presets.pop(name, None)
+        if preset is not None:
+            self._by_fingerprint[preset.fingerprint].remove(name)
+
+        return preset
+
+    def for_monitors(self, monitors: list[Monitor]) -> list[Preset]:
+        """
+        Presets saved for exactly these monitors, the most recent first.
+        """
+        names = self._by_fingerprint.get(fingerprint(monitors), [])
+        return [self._presets[name] for name in reversed(names)]
+
+    def match(self, monitors: list[Monitor]) -> Optional[Preset]:
+        presets = self.for_monitors(monitors)
+        return presets[0] if presets else None
@@ -0,0 +1,88 @@
+"""
+snapping of a dragged monitor to edges of the other monitors, plain integers, no Qt
+"""
+
+from bisect import bisect_left
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Optional
+
+from wayrandr.constants import SNAP_DISTANCE
+
+
+@dataclass(frozen=True)
+class Rect:
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    def moved_to(self, x: int, y: int) -> "Rect":
+        return Rect(x, y, self.width, self.height)
+
+
+def _nearest(edges: list[int], value: int) -> Optional[int]:
+    if not edges:
+        return None
+
+    index = bisect_left(edges, value)
+    if index == 0:
+        return edges[0]
+
+    if index == len(edges):
+        return edges[-1]
+
+    before, after = edges[index - 1], edges[index]
+    return before if value - before <= after - value else after
+
+
+class SnapIndex:
+    """
+    Sorted edges of the static monitors, built once per drag.
+
+    Both sides of the dragged monitor are snapped to the nearest edge of any other
+    monitor, so it can be put next to it (right to left edge) or aligned with
+    it (left to left edge). Axes are snapped independently, which covers corners too.
+    """
+
+    def __init__(self, rects: Iterable[Rect], distance: int = SNAP_DISTANCE) -> None:
+        self.distance = distance
+        x_edges: set[int] = set()
+        y_edges: set[int] = set()
+        for rect in rects:
+            x_edges.update((rect.x, rect.right))
+            y_edges.update((rect.y, rect.bottom))
+
+        self._x_edges = sorted(x_edges)
+        self._y_edges = sorted(y_edges)
+
+    def _snap_axis(self, edges: list[int], start: int, size: int) -> int:
+        result = start
+        best_distance = self.distance
+        start_edge = _nearest(edges, start)
+        if start_edge is not None and abs(start_edge - start) < best_distance:
+            result = start_edge
+            best_distance = abs(start_edge - start)
+
+        end_edge = _nearest(edges, start + size)
+        if end_edge is not None and abs(end_edge - (start + size)) < best_distance:
+            result = end_edge - size
+
+        return result
+
+    def snap(self, rect: Rect) -> tuple[int, int]:
+        """
+        Returns the final position of `rect`, unchanged if there is nothing to snap to.
+        """
+        return (
+            self._snap_axis(self._x_edges, rect.x, rect.width),
+            self._snap_axis(self._y_edges, rect.y, rect.height),
+        )
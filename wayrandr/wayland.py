@@ -0,0 +1,556 @@
+"""
+minimal pure-python client of the wayland wire protocol, just enough to talk
+zwlr_output_manager_v1 (wlr-output-management-unstable-v1) without forking wlr-randr
+"""
+
+import os
+import socket
+import struct
+from collections.abc import Collection
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from wayrandr.diff import Property
+from wayrandr.monitor import Mode, Monitor, Position, Transform
+
+OUTPUT_MANAGER_INTERFACE = "zwlr_output_manager_v1"
+# make, model and serial_number events came with v2, adaptive_sync with v4
+OUTPUT_MANAGER_VERSION = 4
+DEFAULT_TIMEOUT = 5.0
+
+DISPLAY_ID = 1
+
+_WORD = struct.Struct("=I")
+_INT = struct.Struct("=i")
+_HEADER = struct.Struct("=II")
+
+# interface -> event opcode -> (event name, signature)
+# signature letters: i int, u uint, f fixed, s string, o object, n new_id
+_EVENTS: dict[str, dict[int, tuple[str, str]]] = {
+    "wl_display": {0: ("error", "ous"), 1: ("delete_id", "u")},
+    "wl_registry": {0: ("global", "usu"), 1: ("global_remove", "u")},
+    "wl_callback": {0: ("done", "u")},
+    "zwlr_output_manager_v1": {0: ("head", "n"), 1: ("done", "u"), 2: ("finished", "")},
+    "zwlr_output_head_v1": {
+        0: ("name", "s"),
+        1: ("description", "s"),
+        2: ("physical_size", "ii"),
+        3: ("mode", "n"),
+        4: ("enabled", "i"),
+        5: ("current_mode", "o"),
+        6: ("position", "ii"),
+        7: ("transform", "i"),
+        8: ("scale", "f"),
+        9: ("finished", ""),
+        10: ("make", "s"),
+        11: ("model", "s"),
+        12: ("serial_number", "s"),
+        13: ("adaptive_sync", "u"),
+    },
+    "zwlr_output_mode_v1": {
+        0: ("size", "ii"),
+        1: ("refresh", "i"),
+        2: ("preferred", ""),
+        3: ("finished", ""),
+    },
+    "zwlr_output_configuration_v1": {0: ("succeeded", ""), 1: ("failed", ""), 2: ("cancelled", "")},
+}
+
+
+class WaylandError(Exception):
+    pass
+
+
+def _padded(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def encode_arguments(signature: str, *args: Any) -> bytes:
+    result = bytearray()
+    for kind, arg in zip(signature, args, strict=True):
+        if kind == "i":
+            result += _INT.pack(arg)
+        elif kind in "uon":
+            result += _WORD.pack(arg)
+        elif kind == "f":
+            result += _INT.pack(round(arg * 256))
+        elif kind == "s":
+            if arg is None:
+                result += _WORD.pack(0)
+                continue
+
+            raw = arg.encode() + b"\0"
+            result += _WORD.pack(len(raw))
+            result += raw.ljust(_padded(len(raw)), b"\0")
+        else:
+            raise ValueError(f"Unknown argument type {kind}")
+
+    return bytes(result)
+
+
+def decode_arguments(signature: str, payload: bytes) -> list[Any]:
+    result: list[Any] = []
+    offset = 0
+    for kind in signature:
+        if kind == "i":
+            result.append(_INT.unpack_from(payload, offset)[0])
+            offset += 4
+        elif kind in "uon":
+            result.append(_WORD.unpack_from(payload, offset)[0])
+            offset += 4
+        elif kind == "f":
+            result.append(_INT.unpack_from(payload, offset)[0] / 256)
+            offset += 4
+        elif kind == "s":
+            length = _WORD.unpack_from(payload, offset)[0]
+            offset += 4
+            if length == 0:
+                result.append(None)
+                continue
+
+            result.append(payload[offset : offset + length - 1].decode(errors="replace"))
+            offset += _padded(length)
+        else:
+            raise ValueError(f"Unknown argument type {kind}")
+
+    return result
+
+
+def encode_message(object_id: int, opcode: int, payload: bytes = b"") -> bytes:
+    size = _HEADER.size + len(payload)
+    return _HEADER.pack(object_id, size << 16 | opcode) + payload
+
+
+def socket_path(display: Optional[str] = None) -> str:
+    display = display or os.environ.get("WAYLAND_DISPLAY", "wayland-0")
+    if os.path.isabs(display):
+        return display
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir is None:
+        raise WaylandError("XDG_RUNTIME_DIR is not set")
+
+    return os.path.join(runtime_dir, display)
+
+
+class WaylandConnection:
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._buffer = b""
+        self._next_id = DISPLAY_ID + 1
+        self._objects: dict[int, tuple[str, Any]] = {}
+        self.register(DISPLAY_ID, "wl_display", self)
+
+    @classmethod
+    def connect(
+        cls,
+        display: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> "WaylandConnection":
+        path = socket_path(display)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except OSError as e:
+            sock.close()
+            raise WaylandError(f"Can't connect to wayland display {path}: {e}") from e
+
+        return cls(sock)
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self) -> "WaylandConnection":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def register(self, object_id: int, interface: str, handler: Any) -> None:
+        self._objects[object_id] = (interface, handler)
+
+    def new_id(self, interface: str, handler: Any) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        self.register(object_id, interface, handler)
+        return object_id
+
+    def get(self, object_id: int) -> Any:
+        return self._objects[object_id][1]
+
+    def send(self, object_id: int, opcode: int, signature: str = "", *args: Any) -> None:
+        message = encode_message(object_id, opcode, encode_arguments(signature, *args))
+        try:
+            self._sock.sendall(message)
+        except OSError as e:
+            raise WaylandError(f"Can't send message to compositor: {e}") from e
+
+    def dispatch(self) -> None:
+        """
+        Block until some data arrive and handle every complete event in them.
+        """
+        try:
+            data = self._sock.recv(4096)
+        except TimeoutError as e:
+            raise WaylandError("Compositor did not respond in time") from e
+        except OSError as e:
+            raise WaylandError(f"Can't read from compositor: {e}") from e
+
+        if not data:
+            raise WaylandError("Compositor closed the connection")
+
+        self._buffer += data
+        while len(self._buffer) >= _HEADER.size:
+            object_id, size_opcode = _HEADER.unpack_from(self._buffer)
+            size = size_opcode >> 16
+            if size < _HEADER.size:
+                raise WaylandError(f"Malformed message of size {size}")
+
+            if len(self._buffer) < size:
+                break
+
+            payload = self._buffer[_HEADER.size : size]
+            self._buffer = self._buffer[size:]
+            self._handle(object_id, size_opcode & 0xFFFF, payload)
+
+    def _handle(self, object_id: int, opcode: int, payload: bytes) -> None:
+        # events for already destroyed objects are legit, just drop them
+        if object_id not in self._objects:
+            return
+
+        interface, handler = self._objects[object_id]
+        event = _EVENTS.get(interface, {}).get(opcode)
+        if event is None or handler is None:
+            return
+
+        name, signature = event
+        callback = getattr(handler, f"on_{name}", None)
+        if callback is not None:
+            callback(*decode_arguments(signature, payload))
+
+    def roundtrip(self) -> None:
+        callback = _Callback()
+        self.send(DISPLAY_ID, 0, "n", self.new_id("wl_callback", callback))
+        while not callback.done:
+            self.dispatch()
+
+    def on_error(self, object_id: int, code: int, message: str) -> None:
+        interface = self._objects.get(object_id, ("unknown",))[0]
+        raise WaylandError(f"Protocol error {code} on {interface}@{object_id}: {message}")
+
+    def on_delete_id(self, object_id: int) -> None:
+        self._objects.pop(object_id, None)
+
+
+class _Callback:
+    def __init__(self) -> None:
+        self.done = False
+
+    def on_done(self, _: int) -> None:
+        self.done = True
+
+
+class _Registry:
+    def __init__(self) -> None:
+        self.globals: dict[str, tuple[int, int]] = {}
+
+    def on_global(self, name: int, interface: str, version: int) -> None:
+        self.globals[interface] = (name, version)
+
+    def on_global_remove(self, name: int) -> None:
+        self.globals = {
+            interface: value for interface, value in self.globals.items() if value[0] != name
+        }
+
+
+class _Configuration:
+    def __init__(self) -> None:
+        self.result: Optional[str] = None
+
+    def on_succeeded(self) -> None:
+        self.result = "succeeded"
+
+    def on_failed(self) -> None:
+        self.result = "failed"
+
+    def on_cancelled(self) -> None:
+        self.result = "cancelled"
+
+
+@dataclass
+class OutputMode:
+    object_id: int
+    width: int = 0
+    height: int = 0
+    # mHz
+    refresh: int = 0
+    preferred: bool = False
+    finished: bool = False
+
+    def on_size(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+
+    def on_refresh(self, refresh: int) -> None:
+        self.refresh = refresh
+
+    def on_preferred(self) -> None:
+        self.preferred = True
+
+    def on_finished(self) -> None:
+        self.finished = True
+
+    def matches(self, mode: Mode) -> bool:
+        return (
+            self.width == mode.width
+            and self.height == mode.height
+            and abs(self.refresh - round(mode.refresh * 1000)) <= 1
+        )
+
+
+@dataclass
+class OutputHead:
+    object_id: int
+    connection: WaylandConnection = field(repr=False)
+    name: str = ""
+    description: str = ""
+    make: Optional[str] = None
+    model: Optional[str] = None
+    serial_number: Optional[str] = None
+    enabled: bool = False
+    x: int = 0
+    y: int = 0
+    transform: int = 0
+    scale: float = 1.0
+    modes: list[OutputMode] = field(default_factory=list)
+    current_mode: Optional[OutputMode] = None
+    finished: bool = False
+
+    def on_name(self, name: str) -> None:
+        self.name = name
+
+    def on_description(self, description: str) -> None:
+        self.description = description
+
+    def on_make(self, make: str) -> None:
+        self.make = make
+
+    def on_model(self, model: str) -> None:
+        self.model = model
+
+    def on_serial_number(self, serial_number: str) -> None:
+        self.serial_number = serial_number
+
+    def on_mode(self, object_id: int) -> None:
+        mode = OutputMode(object_id)
+        self.connection.register(object_id, "zwlr_output_mode_v1", mode)
+        self.modes.append(mode)
+
+    def on_enabled(self, enabled: int) -> None:
+        self.enabled = bool(enabled)
+        if not self.enabled:
+            self.current_mode = None
+
+    def on_current_mode(self, object_id: int) -> None:
+        self.current_mode = self.connection.get(object_id)
+
+    def on_position(self, x: int, y: int) -> None:
+        self.x = x
+        self.y = y
+
+    def on_transform(self, transform: int) -> None:
+        self.transform = transform
+
+    def on_scale(self, scale: float) -> None:
+        self.scale = scale
+
+    def on_finished(self) -> None:
+        self.finished = True
+
+    def find_mode(self, mode: Mode) -> Optional[OutputMode]:
+        for output_mode in self.modes:
+            if not output_mode.finished and output_mode.matches(mode):
+                return output_mode
+
+        return None
+
+    def to_monitor(self) -> Monitor:
+        modes = [
+            Mode(
+                width=mode.width,
+                height=mode.height,
+                refresh=mode.refresh / 1000,
+                preferred=mode.preferred,
+                current=mode is self.current_mode,
+            )
+            for mode in self.modes
+            if not mode.finished
+        ]
+        return Monitor(
+            name=self.name,
+            make=self.make or "Unknown",
+            model=self.model,
+            serial=self.serial_number,
+            enabled=self.enabled,
+            scale=self.scale,
+            position=Position(x=self.x, y=self.y),
+            modes=modes,
+            transform=Transform.reverse_map()[self.transform],
+        )
+
+
+class OutputManager:
+    """
+    Bound zwlr_output_manager_v1 global together with the current state of all heads.
+    """
+
+    def __init__(self, connection: WaylandConnection) -> None:
+        self.connection = connection
+        self.serial: Optional[int] = None
+        self._heads: dict[int, OutputHead] = {}
+
+        registry = _Registry()
+        registry_id = connection.new_id("wl_registry", registry)
+        connection.send(DISPLAY_ID, 1, "n", registry_id)
+        connection.roundtrip()
+        if OUTPUT_MANAGER_INTERFACE not in registry.globals:
+            raise WaylandError(f"Compositor does not support {OUTPUT_MANAGER_INTERFACE}")
+
+        name, version = registry.globals[OUTPUT_MANAGER_INTERFACE]
+        self._manager_id = connection.new_id(OUTPUT_MANAGER_INTERFACE, self)
+        # wl_registry.bind has untyped new_id: interface, version and the id itself
+        connection.send(
+            registry_id,
+            0,
+            "usun",
+            name,
+            OUTPUT_MANAGER_INTERFACE,
+            min(version, OUTPUT_MANAGER_VERSION),
+            self._manager_id,
+        )
+        while self.serial is None:
+            connection.dispatch()
+
+    @classmethod
+    def connect(
+        cls,
+        display: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> "OutputManager":
+        connection = WaylandConnection.connect(display, timeout)
+        try:
+            return cls(connection)
+        except WaylandError:
+            connection.close()
+            raise
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "OutputManager":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def heads(self) -> list[OutputHead]:
+        return [head for head in self._heads.values() if not head.finished]
+
+    def on_head(self, object_id: int) -> None:
+        head = OutputHead(object_id, self.connection)
+        self.connection.register(object_id, "zwlr_output_head_v1", head)
+        self._heads[object_id] = head
+
+    def on_done(self, serial: int) -> None:
+        self.serial = serial
+
+    def on_finished(self) -> None:
+        raise WaylandError(f"Compositor finished {OUTPUT_MANAGER_INTERFACE}")
+
+    def monitors(self) -> list[Monitor]:
+        return [head.to_monitor() for head in self.heads]
+
+    def _configure_head(
+        self,
+        configuration_id: int,
+        head: OutputHead,
+        monitor: Optional[Monitor],
+        properties: Collection[Property],
+    ) -> None:
+        # properties that are not set keep their current value
+        connection = self.connection
+        head_id = connection.new_id("zwlr_output_configuration_head_v1", None)
+        connection.send(configuration_id, 0, "no", head_id, head.object_id)
+
+        if monitor is None:
+            return
+
+        mode = monitor.active_mode
+        if Property.mode in properties and mode is not None:
+            output_mode = head.find_mode(mode)
+            if output_mode is not None:
+                connection.send(head_id, 0, "o", output_mode.object_id)
+            else:
+                connection.send(
+                    head_id,
+                    1,
+                    "iii",
+                    mode.width,
+                    mode.height,
+                    round(mode.refresh * 1000),
+                )
+
+        if Property.position in properties:
+            connection.send(head_id, 2, "ii", monitor.position.x, monitor.position.y)
+
+        if Property.transform in properties:
+            connection.send(head_id, 3, "i", monitor.transform.value_index())
+
+        if Property.scale in properties:
+            connection.send(head_id, 4, "f", monitor.scale)
+
+    def apply(
+        self,
+        monitors: list[Monitor],
+        test_only: bool = False,
+        changes: Optional[dict[str, Collection[Property]]] = None,
+    ) -> None:
+        """
+        Apply (or only test) the configuration of all heads in one transaction.
+
+        Heads without a matching monitor keep their current state. If `changes` is given,
+        only the listed properties of each monitor are sent.
+        """
+        connection = self.connection
+        configuration = _Configuration()
+        configuration_id = connection.new_id("zwlr_output_configuration_v1", configuration)
+        connection.send(self._manager_id, 0, "nu", configuration_id, self.serial)
+
+        by_name = {monitor.name: monitor for monitor in monitors}
+        for head in self.heads:
+            monitor = by_name.get(head.name)
+            enabled = head.enabled if monitor is None else monitor.enabled
+            if not enabled:
+                connection.send(configuration_id, 1, "o", head.object_id)
+                continue
+
+            properties: Collection[Property] = ()
+            if monitor is not None:
+                properties = set(Property) if changes is None else changes[monitor.name]
+
+            self._configure_head(configuration_id, head, monitor, properties)
+
+        connection.send(configuration_id, 3 if test_only else 2)
+        while configuration.result is None:
+            connection.dispatch()
+
+        connection.send(configuration_id, 4)
+        if configuration.result != "succeeded":
+            raise WaylandError(f"Output configuration {configuration.result}")
+
+
+def get_monitors(display: Optional[str] = None) -> list[Monitor]:
+    with OutputManager.connect(display) as manager:
+        return manager.monitors()